@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 
 import os
 
+from PIL import features as image_features
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -40,8 +42,8 @@ INSTALLED_APPS = [
     
     ### MY OWN APPLICATIONS ###
     'api',
-    'core',
-    'user',
+    'core.apps.CoreConfig',
+    'user.apps.UserConfig',
     'recipe',
     
     ### THIRD PARTY APPLICATIONS ###
@@ -50,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,11 +64,93 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'user.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-    ]
+    ],
+    # orjson drop-ins for DRF's JSON renderer and parser, byte for byte
+    # compatible with them (see core.renderers and core.parsers)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Default and largest page size served by core.pagination.KeysetPagination
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+
+# Caches
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+# The `auth` and `responses` caches are invalidated on writes: a revoked
+# or deleted token, a deactivated user, a changed recipe. That only
+# reaches every process serving the api when they share one cache, so
+# with several workers (`manage.py serve`, docker-compose) CACHE_BACKEND
+# must point at a shared backend, e.g. memcached:
+#
+#   CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+#   CACHE_LOCATION=cache:11211
+#
+# The per-process LocMemCache default is only right for a single process,
+# like runserver; `serve` refuses to start more workers on it, and the
+# tests always run on it (see TEST_RUNNER). AUTH_CACHE_* and
+# RESPONSE_CACHE_* override either alias on its own.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', '')
+
+
+def cache_options(backend, max_entries):
+    # memcached evicts by itself and its client rejects unknown options
+    if 'memcached' in backend:
+        return {}
+
+    return {'MAX_ENTRIES': max_entries}
+
+
+AUTH_CACHE_BACKEND = os.environ.get('AUTH_CACHE_BACKEND', CACHE_BACKEND)
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', CACHE_BACKEND)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Token -> user lookups for user.authentication.SignedTokenAuthentication,
+    # a bounded LRU whose entries expire after AUTH_CACHE_TIMEOUT seconds.
+    'auth': {
+        'BACKEND': AUTH_CACHE_BACKEND,
+        'LOCATION': os.environ.get('AUTH_CACHE_LOCATION', CACHE_LOCATION or 'auth-tokens'),
+        'TIMEOUT': int(os.environ.get('AUTH_CACHE_TIMEOUT', 300)),
+        'OPTIONS': cache_options(
+            AUTH_CACHE_BACKEND,
+            int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', 10000))
+        ),
+    },
+    # Serialized recipe/tag/ingredient reads for core.mixins.CachedResponseMixin,
+    # namespaced per user and invalidated by bumping the user's version.
+    'responses': {
+        'BACKEND': RESPONSE_CACHE_BACKEND,
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', CACHE_LOCATION or 'api-responses'),
+        'OPTIONS': cache_options(
+            RESPONSE_CACHE_BACKEND,
+            int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 10000))
+        ),
+    },
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 60))
+
+# Tests always run on per-process caches, never on the shared one
+TEST_RUNNER = 'core.runner.LocalCacheTestRunner'
+
+# Lifetime in seconds of the signed tokens issued by user/token/
+ACCESS_TOKEN_LIFETIME = int(os.environ.get('ACCESS_TOKEN_LIFETIME', 15 * 60))
+REFRESH_TOKEN_LIFETIME = int(os.environ.get('REFRESH_TOKEN_LIFETIME', 7 * 24 * 60 * 60))
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -100,14 +185,27 @@ WSGI_APPLICATION = 'app.wsgi.application'
 #### POSTGRESQL DATABASE #### 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        # Seconds a connection is kept open across requests; it is checked
+        # with a `SELECT 1` before the first query of each request reuses it
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# With DB_POOL_SIZE > 0 the threads of each worker share a pool of at
+# most that many connections, waiting up to DB_POOL_TIMEOUT seconds for
+# one. Connections then go back to the pool after every request.
+if int(os.environ.get('DB_POOL_SIZE', 0)) > 0:
+    DATABASES['default']['POOL'] = {
+        'MAX_SIZE': int(os.environ.get('DB_POOL_SIZE')),
+        'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -150,4 +248,34 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# How core.views.serve_media hands media files to the front proxy: ''
+# sends them from the worker, 'x-accel-redirect' (nginx) redirects to the
+# internal location MEDIA_ACCEL_REDIRECT_URL, 'x-sendfile' (Apache,
+# lighttpd) passes the absolute path.
+MEDIA_ACCEL_BACKEND = os.environ.get('MEDIA_ACCEL_BACKEND', '')
+MEDIA_ACCEL_REDIRECT_URL = os.environ.get('MEDIA_ACCEL_REDIRECT_URL', '/protected-media/')
+
+# Media below these prefixes is named after its content and never
+# rewritten, so it is served with `Cache-Control: immutable`.
+MEDIA_IMMUTABLE_PREFIXES = ('uploads/recipe/',)
+
+# Recipe image uploads are streamed to disk and refused once larger than
+# IMAGE_UPLOAD_MAX_SIZE bytes, or when their header announces more than
+# IMAGE_UPLOAD_MAX_PIXELS pixels.
+IMAGE_UPLOAD_MAX_SIZE = int(os.environ.get('IMAGE_UPLOAD_MAX_SIZE', 20 * 1024 * 1024))
+IMAGE_UPLOAD_MAX_PIXELS = int(os.environ.get('IMAGE_UPLOAD_MAX_PIXELS', 50 * 1000 * 1000))
+
+# WebP only where Pillow was built with libwebp (see the Dockerfile), so
+# an image without the codec neither accepts uploads it can't decode nor
+# renders variants it can't encode.
+WEBP_FORMATS = ('WEBP',) if image_features.check('webp') else ()
+IMAGE_UPLOAD_FORMATS = ('JPEG', 'PNG') + WEBP_FORMATS
+
+# Resized copies of uploaded recipe images, rendered in a process pool of
+# THUMBNAIL_WORKERS processes (0 renders them inline, during the request).
+THUMBNAIL_WIDTHS = (160, 320, 640, 1280)
+THUMBNAIL_FORMATS = WEBP_FORMATS + ('JPEG',)
+THUMBNAIL_QUALITY = int(os.environ.get('THUMBNAIL_QUALITY', 80))
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+
 AUTH_USER_MODEL = 'core.User'
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext as _
 
-from .models import User, Tag, Ingredient, Recipe
+from .models import User, Tag, Ingredient, Recipe, ImageBlob
+from .thumbnails import schedule_thumbnails
 
 # Register your models here.
 
@@ -25,7 +26,28 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
     
+
+class RecipeAdmin(admin.ModelAdmin):
+    
+    def save_model(self, request, obj, form, change):
+        # Uploads go through the blobs like the api's, so the refcounts
+        # stay right for every recipe sharing the file
+        if 'image' not in form.changed_data:
+            return super(RecipeAdmin, self).save_model(request, obj, form, change)
+        
+        previous = form.initial.get('image')
+        if obj.image:
+            obj.image = ImageBlob.objects.acquire(obj.image.file).name
+        obj.image_variants = ''
+        super(RecipeAdmin, self).save_model(request, obj, form, change)
+        
+        if previous:
+            ImageBlob.objects.release(previous.name)
+        if obj.image:
+            schedule_thumbnails(obj)
+    
+    
 admin.site.register(User, UserAdmin)
 admin.site.register(Tag)
 admin.site.register(Ingredient)
-admin.site.register(Recipe)
\ No newline at end of file
+admin.site.register(Recipe, RecipeAdmin)
\ No newline at end of file
@@ -0,0 +1,77 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+RESPONSE_CACHE_ALIAS = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'responses')
+
+
+def _cache():
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+def user_version_key(user_id):
+    return f'resp:version:{user_id}'
+
+
+def _new_version():
+    # Versions start from the clock rather than 1, so a version key that
+    # was evicted never hands out a number that old entries were stored under.
+    return int(time.time() * 1000)
+
+
+def get_user_version(user_id):
+    cache = _cache()
+    key = user_version_key(user_id)
+
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_user_version(user_id):
+    """
+    Move the user's cached responses to a new namespace. Old entries are
+    never looked up again and simply expire, so no key scan is needed.
+    """
+    cache = _cache()
+    key = user_version_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def response_cache_key(user_id, view_name, url):
+    # The whole url, host included: cached pages carry absolute links
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'resp:{user_id}:{get_user_version(user_id)}:{view_name}:{digest}'
+
+
+def isolated_caches(prefix):
+    """
+    CACHES with every alias moved to its own LocMemCache, for runs that
+    clear caches or create throwaway users (tests, the bench) and so must
+    never reach the shared cache real users authenticate from.
+    """
+    return {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'{prefix}-{alias}',
+            'TIMEOUT': config.get('TIMEOUT', 300),
+        }
+        for alias, config in settings.CACHES.items()
+    }
+
+
+def get_response(key):
+    return _cache().get(key)
+
+
+def set_response(key, data):
+    _cache().set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
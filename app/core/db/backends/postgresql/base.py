@@ -0,0 +1,37 @@
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.db.wrappers import HealthCheckMixin, PooledConnectionMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, PooledConnectionMixin, base.DatabaseWrapper):
+    """
+    Django's PostgreSQL backend with persistent connections that are
+    checked before reuse and an optional in-process connection pool.
+    """
+
+    def validate_pooled_connection(self, connection):
+        if connection.closed:
+            return False
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except base.Database.Error:
+            return False
+
+        return True
+
+    def reset_pooled_connection(self, connection):
+        if connection.closed:
+            return False
+
+        try:
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except base.Database.Error:
+            return False
+
+        return True
@@ -0,0 +1,44 @@
+import time
+
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+def ping(alias='default'):
+    """
+    Run a `SELECT 1` on the database and return the round trip in
+    seconds. Raises the backend's OperationalError when it is down.
+    """
+    connection = connections[alias]
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except Exception:
+        # Don't keep a broken connection around for the next attempt
+        connection.close()
+        raise
+
+    return time.perf_counter() - started
+
+
+_migrated = set()
+
+
+def pending_migrations(alias='default'):
+    """
+    The migrations not yet applied to the database. Loading the migration
+    graph is slow, but once everything is applied nothing new can appear
+    without a deploy, which restarts the process, so that is remembered.
+    """
+    if alias in _migrated:
+        return []
+
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    pending = [f'{migration.app_label}.{migration.name}' for migration, backwards in plan]
+    if not pending:
+        _migrated.add(alias)
+
+    return pending
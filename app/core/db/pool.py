@@ -0,0 +1,152 @@
+import collections
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool(object):
+    """
+    A bounded pool of DB-API connections shared by the threads of one
+    process. `checkout()` hands out an idle connection, opens a new one
+    while fewer than `max_size` exist, or waits up to `timeout` seconds
+    for one to be checked back in.
+
+    Idle connections are passed through `validate` before being reused;
+    those that fail it are closed and replaced.
+    """
+
+    def __init__(self, connect, max_size, timeout, validate=None):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.validate = validate
+
+        self.pid = os.getpid()
+        self._idle = collections.deque()
+        self._size = 0
+        self._condition = threading.Condition()
+
+        self.checkouts = 0
+        self.connects = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+        self.discarded = 0
+
+    def checkout(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        with self._condition:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No database connection available after {self.timeout}s'
+                    )
+                waited = True
+                self._condition.wait(remaining)
+
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                self._size += 1
+
+            elapsed = time.monotonic() - started
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_time += elapsed
+                self.max_wait_time = max(self.max_wait_time, elapsed)
+
+        if connection is not None and self.validate is not None and not self.validate(connection):
+            # Keep the slot and open a replacement in it
+            self._close_quietly(connection)
+            connection = None
+            with self._condition:
+                self.discarded += 1
+
+        if connection is None:
+            try:
+                connection = self.connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self.connects += 1
+
+        return connection
+
+    def checkin(self, connection, discard=False):
+        if discard:
+            self._discard(connection)
+            return
+
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _discard(self, connection):
+        self._close_quietly(connection)
+        with self._condition:
+            self._size -= 1
+            self.discarded += 1
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = list(self._idle), collections.deque()
+        for connection in idle:
+            self._discard(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'waits': self.waits,
+                'wait_time_seconds': self.wait_time,
+                'max_wait_time_seconds': self.max_wait_time,
+                'timeouts': self.timeouts,
+                'discarded': self.discarded,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, max_size, timeout, validate=None):
+    with _pools_lock:
+        # A forked worker must not reuse the sockets of its parent's pool,
+        # nor close them under it, so it simply starts a pool of its own
+        if key not in _pools or _pools[key].pid != os.getpid():
+            _pools[key] = ConnectionPool(connect, max_size, timeout, validate)
+
+        return _pools[key]
+
+
+def pool_stats():
+    """ The stats of every pool in this process, by database alias """
+    with _pools_lock:
+        pools = list(_pools.items())
+
+    return {key[0]: pool.stats() for key, pool in pools}
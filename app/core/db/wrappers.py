@@ -0,0 +1,91 @@
+from core.db.pool import get_pool
+
+
+class HealthCheckMixin(object):
+    """
+    Validate a persistent connection (CONN_MAX_AGE > 0) before the first
+    query of each request reuses it, and reconnect if the server went
+    away in between, instead of failing that request.
+    """
+    health_check_needed = False
+
+    def close_if_unusable_or_obsolete(self):
+        super(HealthCheckMixin, self).close_if_unusable_or_obsolete()
+        # Called when a request starts and finishes, which is exactly
+        # when a kept connection may have sat idle
+        self.health_check_needed = self.connection is not None
+
+    def ensure_connection(self):
+        if self.health_check_needed and not self.in_atomic_block:
+            self.health_check_needed = False
+            if self.connection is not None and not self.is_usable():
+                self.close()
+
+        super(HealthCheckMixin, self).ensure_connection()
+
+
+class PooledConnectionMixin(object):
+    """
+    Check connections out of a per process ConnectionPool instead of
+    opening them, and return them to it instead of closing them, when the
+    database settings have a `POOL` entry:
+
+        'POOL': {'MAX_SIZE': 10, 'TIMEOUT': 10}
+
+    Pair it with CONN_MAX_AGE = 0, so every request hands its connection
+    back for the other threads of the worker.
+    """
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+
+        key = (
+            self.alias,
+            self.settings_dict['HOST'],
+            self.settings_dict['PORT'],
+            self.settings_dict['NAME'],
+        )
+        return get_pool(
+            key,
+            lambda: super(PooledConnectionMixin, self).get_new_connection(conn_params),
+            options.get('MAX_SIZE', 10),
+            options.get('TIMEOUT', 10),
+            self.validate_pooled_connection
+        )
+
+    def validate_pooled_connection(self, connection):
+        """ Return True if the idle `connection` can still run a query """
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+
+        return True
+
+    def reset_pooled_connection(self, connection):
+        """ Return True once `connection` is clean to hand to another thread """
+        return True
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        if pool is None:
+            return super(PooledConnectionMixin, self).get_new_connection(conn_params)
+
+        self.pool = pool
+        return pool.checkout()
+
+    def _close(self):
+        pool = getattr(self, 'pool', None)
+        if pool is None or self.connection is None:
+            return super(PooledConnectionMixin, self)._close()
+
+        # A connection closed inside an atomic block stays referenced by
+        # this wrapper until the block exits, so it can't be shared
+        discard = self.in_atomic_block or not self.reset_pooled_connection(self.connection)
+        pool.checkin(self.connection, discard=discard)
@@ -0,0 +1,387 @@
+import io
+import json
+import math
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
+import django
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import cache as response_cache
+from core import seed
+from core.middleware import QueryRecorder
+from core.models import Tag, Ingredient, Recipe
+from recipe import urls as recipe_urls
+from user import tokens
+from user import urls as user_urls
+
+
+Scenario = namedtuple('Scenario', 'name route method path data format')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def scenario(name, route, method='GET', args=(), query='', data=None, format='json'):
+    return Scenario(name, route, method, reverse(route, args=args) + query, data, format)
+
+
+def sample_png():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 120, 40)).save(buffer, format='PNG')
+
+    return buffer.getvalue()
+
+
+def build_scenarios(user):
+    """
+    One scenario per route and method of recipe/urls.py and user/urls.py
+    (plus the list variants worth tracking), for the data of `user`
+    """
+    recipe = Recipe.objects.filter(user=user).order_by('pk').first()
+    tag_ids = list(Tag.objects.filter(user=user).order_by('pk').values_list('pk', flat=True)[:3])
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).order_by('pk').values_list('pk', flat=True)[:3]
+    )
+    word = recipe.title.split()[-1]
+    new_recipe = {
+        'title': 'Bench recipe',
+        'time_minutes': 30,
+        'price': '12.50',
+        'tags': tag_ids,
+        'ingredients': ingredient_ids,
+    }
+    image = sample_png()
+
+    def upload():
+        return {'image': SimpleUploadedFile('bench.png', image, 'image/png')}
+
+    return [
+        scenario('tag-list', 'recipe:tag-list'),
+        scenario('tag-create', 'recipe:tag-list', 'POST', data={'name': 'bench'}),
+        scenario('tag-bulk-create', 'recipe:tag-bulk', 'POST', data=[
+            {'name': f'bench {number}'} for number in range(10)
+        ]),
+        scenario('tag-detail', 'recipe:tag-detail', args=[tag_ids[0]]),
+        scenario('tag-update', 'recipe:tag-detail', 'PATCH', [tag_ids[0]], data={'name': 'renamed'}),
+        scenario('tag-delete', 'recipe:tag-detail', 'DELETE', [tag_ids[0]]),
+        scenario('ingredient-list', 'recipe:ingredient-list'),
+        scenario('ingredient-create', 'recipe:ingredient-list', 'POST', data={'name': 'bench'}),
+        scenario('ingredient-bulk-create', 'recipe:ingredient-bulk', 'POST', data=[
+            {'name': f'bench {number}'} for number in range(10)
+        ]),
+        scenario('ingredient-detail', 'recipe:ingredient-detail', args=[ingredient_ids[0]]),
+        scenario(
+            'ingredient-update', 'recipe:ingredient-detail', 'PATCH', [ingredient_ids[0]],
+            data={'name': 'renamed'}
+        ),
+        scenario('ingredient-delete', 'recipe:ingredient-detail', 'DELETE', [ingredient_ids[0]]),
+        scenario('recipe-list', 'recipe:recipe-list'),
+        scenario('recipe-list-stream', 'recipe:recipe-list', query='?stream=1'),
+        scenario('recipe-list-sparse', 'recipe:recipe-list', query='?fields=id,title'),
+        scenario('recipe-list-by-tag', 'recipe:recipe-list', query=f'?tags={tag_ids[0]}'),
+        scenario('recipe-search', 'recipe:recipe-list', query=f'?q={word}'),
+        scenario('recipe-create', 'recipe:recipe-list', 'POST', data=new_recipe),
+        scenario('recipe-bulk-create', 'recipe:recipe-bulk', 'POST', data=[new_recipe] * 10),
+        scenario('recipe-detail', 'recipe:recipe-detail', args=[recipe.pk]),
+        scenario(
+            'recipe-update', 'recipe:recipe-detail', 'PATCH', [recipe.pk],
+            data={'title': 'Renamed recipe'}
+        ),
+        scenario('recipe-delete', 'recipe:recipe-detail', 'DELETE', [recipe.pk]),
+        scenario(
+            'recipe-upload-image', 'recipe:recipe-upload-image', 'POST', [recipe.pk],
+            data=upload, format='multipart'
+        ),
+        scenario('autocomplete', 'recipe:autocomplete', query=f'?type=ingredients&q={word[:3]}'),
+        scenario('user-list', 'user:create'),
+        scenario('user-create', 'user:create', 'POST', data={
+            'email': 'bench-new@example.com', 'password': 'bench-password', 'name': 'Bench',
+        }),
+        scenario('token', 'user:token', 'POST', data={
+            'email': user.email, 'password': seed.SEED_PASSWORD,
+        }),
+        scenario('token-refresh', 'user:token-refresh', 'POST', data={
+            'refresh': tokens.issue_refresh_token(user),
+        }),
+        scenario('token-revoke', 'user:token-revoke', 'POST'),
+        scenario('me', 'user:me'),
+        scenario('me-update', 'user:me', 'PATCH', data={'name': 'Renamed'}),
+    ]
+
+
+def uncovered_routes(scenarios):
+    """ The names of the recipe and user routes no scenario requests """
+    routes = {
+        f'{module.app_name}:{pattern.name}'
+        for module in (recipe_urls, user_urls)
+        for pattern in module.urlpatterns
+    }
+
+    return sorted(routes - {item.route for item in scenarios})
+
+
+@contextmanager
+def rolled_back(method):
+    """ Undo the writes of unsafe requests, so every run sees the same rows """
+    if method in SAFE_METHODS:
+        yield
+        return
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def send(client, item):
+    data = item.data() if callable(item.data) else item.data
+    response = getattr(client, item.method.lower())(item.path, data, format=item.format)
+    if response.streaming:
+        # The rows of a streamed list are read while the body is consumed
+        b''.join(response.streaming_content)
+
+    return response
+
+
+def measure(client, item, requests, warmup=1, cold=True):
+    """
+    Send `warmup` + `requests` requests for `item` and return the elapsed
+    seconds and the query count of the last `requests` ones. A `cold`
+    run empties the response cache before each request, outside the
+    timing, so the views do their full work.
+    """
+    timings, queries = [], []
+    for number in range(warmup + requests):
+        if cold:
+            caches[response_cache.RESPONSE_CACHE_ALIAS].clear()
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder), rolled_back(item.method):
+            started = time.perf_counter()
+            response = send(client, item)
+            elapsed = time.perf_counter() - started
+
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{item.name}: {item.method} {item.path} answered {response.status_code}'
+            )
+
+        if number >= warmup:
+            timings.append(elapsed)
+            queries.append(recorder.count)
+
+    return timings, queries
+
+
+def percentile(values, percent):
+    """ The nearest-rank percentile of `values` """
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+
+    return ordered[rank - 1]
+
+
+def summarize(item, timings, queries):
+    return {
+        'route': item.route,
+        'method': item.method,
+        'requests': len(timings),
+        'throughput_rps': round(len(timings) / sum(timings), 1),
+        'mean_ms': round(statistics.mean(timings) * 1000, 3),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'queries': {
+            'min': min(queries),
+            'max': max(queries),
+            'mean': round(statistics.mean(queries), 2),
+        },
+    }
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """
+    Describe each scenario that got slower than `baseline` by more than
+    `threshold` (a fraction) and `min_delta_ms`, at the median or the
+    95th percentile, or that runs more queries than it did
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            continue
+
+        if result['queries']['max'] > before['queries']['max']:
+            regressions.append(
+                f"{name}: {before['queries']['max']} -> {result['queries']['max']} queries"
+            )
+
+        for key in ('p50_ms', 'p95_ms'):
+            old, new = before[key], result[key]
+            if new > old * (1 + threshold) and new - old > min_delta_ms:
+                regressions.append(f'{name}: {key} {old:.3f} -> {new:.3f} (+{new / old - 1:.0%})')
+
+    return regressions
+
+
+@contextmanager
+def test_database():
+    """ Run against a freshly migrated, throwaway copy of the database """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+class Command(BaseCommand):
+    """
+    Seed a dataset and drive every route of the recipe and user apps
+    through DRF's test client, in process, reporting the throughput,
+    p50/p95/p99 latency and queries per request of each as JSON.
+
+    Writes are rolled back after each request. With `--baseline`, the
+    report of an earlier run, the command fails when a route regressed.
+    """
+    help = 'Benchmark the api/v1 endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2)
+        parser.add_argument('--recipes', type=int, default=200, help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=20, help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=50, help='Ingredients per user')
+        parser.add_argument('--links', type=int, default=3, help='Tags and ingredients per recipe')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', nargs='+', default=None, help='Scenario names to run')
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Let reads be answered from the response cache'
+        )
+        parser.add_argument(
+            '--existing-db',
+            action='store_true',
+            help='Seed the configured database instead of a throwaway test database'
+        )
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+        parser.add_argument('--baseline', help='A previous report to compare against')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Allowed slowdown against the baseline, as a fraction'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=0.5,
+            help='Ignore slowdowns smaller than this'
+        )
+
+    def handle(self, *args, **options):
+        for size in ('users', 'recipes', 'tags', 'ingredients', 'requests'):
+            if options[size] < 1:
+                raise CommandError(f'--{size} must be at least 1')
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        media_root = tempfile.mkdtemp(prefix='bench-media-')
+        database = nullcontext() if options['existing_db'] else test_database()
+        try:
+            # The sample image is narrower than every thumbnail width, so
+            # rendering inline is close to free and never races the
+            # rolled back writes from the process pool. The cold runs clear
+            # the caches and the seeded users reuse real users' pks, so
+            # neither may touch the shared cache.
+            settings = override_settings(
+                MEDIA_ROOT=media_root,
+                ALLOWED_HOSTS=['testserver'],
+                THUMBNAIL_WORKERS=0,
+                CACHES=response_cache.isolated_caches('bench')
+            )
+            with database, settings:
+                results = self.run_scenarios(options)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        report = {
+            'dataset': {
+                key: options[key] for key in ('users', 'recipes', 'tags', 'ingredients', 'links')
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'response_cache': 'warm' if options['warm_cache'] else 'cold',
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            regressions = compare(
+                results, baseline, options['threshold'], options['min_delta_ms']
+            )
+            for regression in regressions:
+                self.stderr.write(f'regression: {regression}')
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against the baseline')
+
+    def run_scenarios(self, options):
+        user = seed.seed(
+            options['users'],
+            options['recipes'],
+            options['tags'],
+            options['ingredients'],
+            links=options['links']
+        )[0]
+        scenarios = build_scenarios(user)
+        for route in uncovered_routes(scenarios):
+            self.stderr.write(f'warning: no scenario requests {route}')
+
+        if options['only']:
+            unknown = set(options['only']) - {item.name for item in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            scenarios = [item for item in scenarios if item.name in options['only']]
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {tokens.issue_access_token(user)}')
+
+        results = {}
+        for item in scenarios:
+            timings, queries = measure(
+                client, item, options['requests'], options['warmup'], not options['warm_cache']
+            )
+            result = results[item.name] = summarize(item, timings, queries)
+            self.stderr.write(
+                f"{item.name:<24} {result['throughput_rps']:>9.1f} req/s  "
+                f"p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+                f"p99 {result['p99_ms']:>8.2f} ms  {result['queries']['max']:>3} queries"
+            )
+
+        return results
+
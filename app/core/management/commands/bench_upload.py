@@ -0,0 +1,107 @@
+import io
+import multiprocessing
+import os
+import resource
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.files.uploadhandler import load_handler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from rest_framework import serializers
+from rest_framework.parsers import MultiPartParser
+from rest_framework.request import Request
+
+from core.uploads import LimitedTemporaryFileUploadHandler
+from recipe.serializers import UploadedImageField
+
+
+def sample_jpeg(width, height, quality):
+    from PIL import Image
+
+    # Noise compresses badly, a worst case for the file size
+    image = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+
+    return buffer.getvalue()
+
+
+def default_handlers(request):
+    return [load_handler(path, request) for path in settings.FILE_UPLOAD_HANDLERS]
+
+
+def streamed_handlers(request):
+    return [LimitedTemporaryFileUploadHandler(request, max_size=2 ** 62)]
+
+
+PIPELINES = (
+    ('default', default_handlers, serializers.ImageField),
+    ('streamed', streamed_handlers, UploadedImageField),
+)
+
+
+def measure(body, pipeline):
+    """
+    Receive and validate one upload and return the peak traced Python
+    memory, the growth of the peak RSS (which also counts Pillow's C
+    allocations) and the elapsed time. Runs in a fresh process each time
+    so the RSS high-water mark starts clean.
+    """
+    handlers, field_class = pipeline[1:]
+    upload = io.BytesIO(body)
+    upload.name = 'photo.jpg'
+    request = RequestFactory().post('/', {'image': upload})
+    field = field_class()
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    request.upload_handlers = handlers(request)
+    files = Request(request, parsers=[MultiPartParser()]).FILES
+    field.run_validation(files['image'])
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    files['image'].close()
+
+    return peak, rss_growth * 1024, elapsed
+
+
+class Command(BaseCommand):
+    """
+    Measure the peak memory and the time taken to receive and
+    validate one image upload, with Django's default upload handlers and
+    DRF's ImageField against the streamed, header-checked upload path.
+    """
+    help = 'Benchmark peak memory per recipe image upload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=4032)
+        parser.add_argument('--height', type=int, default=3024)
+        parser.add_argument('--quality', type=int, default=90)
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        body = sample_jpeg(options['width'], options['height'], options['quality'])
+        self.stdout.write(
+            f"{options['width']}x{options['height']} JPEG, {len(body) / 1024 / 1024:.1f} MiB, "
+            f"{options['runs']} runs"
+        )
+
+        context = multiprocessing.get_context('fork')
+        for pipeline in PIPELINES:
+            with context.Pool(processes=1, maxtasksperchild=1) as pool:
+                results = [pool.apply(measure, (body, pipeline)) for _ in range(options['runs'])]
+
+            peaks, rss, timings = zip(*results)
+            self.stdout.write(
+                f'{pipeline[0]:>10}: python peak {statistics.median(peaks) / 1024:10.1f} KiB  '
+                f'rss growth {statistics.median(rss) / 1024:10.1f} KiB  '
+                f'{statistics.median(timings) * 1000:8.1f} ms'
+            )
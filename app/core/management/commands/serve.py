@@ -0,0 +1,179 @@
+import gc
+import glob
+import os
+import tempfile
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from gunicorn.app.base import BaseApplication
+
+
+def cpu_count():
+    """ The CPUs this process may run on, which respects container cpusets """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_workers():
+    return int(os.environ.get('WEB_CONCURRENCY', 2 * cpu_count() + 1))
+
+
+def process_local_caches():
+    """
+    The aliases of the caches that must be shared between workers but are
+    kept in each process's memory, where an invalidation made by one
+    worker is never seen by the others.
+    """
+    from core.cache import RESPONSE_CACHE_ALIAS
+    from user.authentication import AUTH_CACHE_ALIAS
+
+    return [
+        alias for alias in (AUTH_CACHE_ALIAS, RESPONSE_CACHE_ALIAS)
+        if isinstance(caches[alias], LocMemCache)
+    ]
+
+
+def load_application():
+    """
+    Build the WSGI application and import everything a request touches,
+    views, serializers and models through the url resolver, so that with
+    preloading the workers share those pages with the master.
+    """
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import get_resolver
+
+    application = get_wsgi_application()
+    get_resolver().url_patterns
+
+    return application
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        # Park everything imported so far in the permanent generation: the
+        # workers' collector then never writes to those objects, which
+        # keeps the preloaded pages shared after fork
+        gc.collect()
+        gc.freeze()
+
+
+def pre_fork(server, worker):
+    # Never hand a connection opened while preloading to a worker
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    from core.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
+
+
+def prepare_metrics_dir():
+    """
+    Point the workers' Prometheus metrics at a shared directory, before
+    any metric is created, so /metrics sums them across processes. Files
+    left over by a previous run would be summed too, so they are removed.
+    """
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not path:
+        path = tempfile.mkdtemp(prefix='prometheus-')
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = path
+
+    for stale in glob.glob(os.path.join(path, '*.db')):
+        os.remove(stale)
+
+    return path
+
+
+class WSGIServer(BaseApplication):
+
+    def __init__(self, options):
+        self.options = options
+        super(WSGIServer, self).__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return load_application()
+
+
+class Command(BaseCommand):
+    """
+    Run the api under gunicorn's preforking server.
+
+    The master keeps `--workers` processes alive and replaces any that
+    die. SIGHUP reloads the configuration and rolls the workers over
+    gracefully, TTIN/TTOU add or remove a worker at runtime, and every
+    worker is recycled after about `--max-requests` requests.
+    """
+    help = 'Run the production WSGI server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default=os.environ.get('SERVER_BIND', '0.0.0.0:8000'))
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Defaults to $WEB_CONCURRENCY or 2 x CPUs + 1'
+        )
+        parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 1)))
+        parser.add_argument(
+            '--max-requests',
+            type=int,
+            default=int(os.environ.get('WEB_MAX_REQUESTS', 1000))
+        )
+        parser.add_argument(
+            '--max-requests-jitter',
+            type=int,
+            default=int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 100))
+        )
+        parser.add_argument('--timeout', type=int, default=int(os.environ.get('WEB_TIMEOUT', 30)))
+        parser.add_argument('--graceful-timeout', type=int, default=30)
+        parser.add_argument('--keep-alive', type=int, default=5)
+        parser.add_argument('--no-preload', action='store_true')
+
+    def get_server_options(self, options):
+        return {
+            'bind': options['bind'],
+            'workers': options['workers'] or default_workers(),
+            'threads': options['threads'],
+            'max_requests': options['max_requests'],
+            'max_requests_jitter': options['max_requests_jitter'],
+            'timeout': options['timeout'],
+            'graceful_timeout': options['graceful_timeout'],
+            'keepalive': options['keep_alive'],
+            'preload_app': not options['no_preload'],
+            'when_ready': when_ready,
+            'pre_fork': pre_fork,
+            'child_exit': child_exit,
+            'accesslog': '-',
+            'errorlog': '-',
+        }
+
+    def execute(self, *args, **options):
+        # Before the system checks import the url conf, and with it the
+        # metrics, which pick their storage when they are created
+        prepare_metrics_dir()
+        return super(Command, self).execute(*args, **options)
+
+    def handle(self, *args, **options):
+        server_options = self.get_server_options(options)
+        local = process_local_caches()
+        if server_options['workers'] > 1 and local:
+            # Revoked tokens, deactivated users and changed recipes would
+            # keep being served from the other workers' copies
+            raise CommandError(
+                f'The {", ".join(local)} cache must be shared by the '
+                f'{server_options["workers"]} workers: set CACHE_BACKEND to a '
+                f'shared backend such as memcached, or run with --workers 1'
+            )
+
+        WSGIServer(server_options).run()
+
@@ -1,20 +1,47 @@
+import random
 import time
 
-from django.db import connections
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+
+from core.db.health import ping
 
 
 class Command(BaseCommand):
-    
+    """
+    Block until the database answers a query. Attempts back off
+    exponentially from `--initial-delay` up to `--max-delay` seconds, with
+    jitter so a fleet of containers doesn't retry in lockstep, and give up
+    after `--timeout` seconds.
+    """
+    help = 'Wait until the database accepts queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--initial-delay', type=float, default=0.5)
+        parser.add_argument('--max-delay', type=float, default=5)
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        delay = options['initial_delay']
+
+        while True:
             try:
-                db_conn = connections['default']
+                ping(options['database'])
+                break
             except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
-                
-        self.stdout.write(self.style.SUCCESS('Database available!'))
\ No newline at end of file
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database unavailable after {options['timeout']:g} seconds"
+                    )
+
+                wait = min(remaining, delay / 2 + random.uniform(0, delay / 2))
+                self.stdout.write(f'Database unavailable, waiting {wait:.1f} seconds...')
+                time.sleep(wait)
+                delay = min(delay * 2, options['max_delay'])
+
+        self.stdout.write(self.style.SUCCESS('Database available!'))
@@ -0,0 +1,109 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+
+from core.db.pool import pool_stats
+
+
+# Set PROMETHEUS_MULTIPROC_DIR before this module is first imported (the
+# serve command does) and every worker writes its samples to mmapped files
+# in that directory, which /metrics then sums across processes.
+MULTIPROCESS_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_LATENCY = Histogram(
+    'api_request_duration_seconds',
+    'Time from the first middleware until the response is returned',
+    ['view', 'method', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'api_request_db_queries',
+    'Database queries run per request',
+    ['view', 'method'],
+    buckets=QUERY_BUCKETS
+)
+DB_TIME = Histogram(
+    'api_request_db_duration_seconds',
+    'Time per request spent waiting on the database',
+    ['view', 'method'],
+    buckets=LATENCY_BUCKETS
+)
+SERIALIZE_TIME = Histogram(
+    'api_response_serialize_seconds',
+    'Time per request spent in serializer.data, turning rows into primitives',
+    ['view', 'method'],
+    buckets=LATENCY_BUCKETS
+)
+RENDER_TIME = Histogram(
+    'api_response_render_seconds',
+    'Time per request spent encoding the response body, e.g. to JSON',
+    ['view', 'method'],
+    buckets=LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    'api_response_size_bytes',
+    'Size of the response body, when it is known',
+    ['view', 'method'],
+    buckets=SIZE_BUCKETS
+)
+
+POOL_CONNECTIONS = Gauge(
+    'db_pool_connections',
+    'Connections held by the in-process pools',
+    ['alias', 'state'],
+    multiprocess_mode='livesum'
+)
+POOL_CHECKOUTS = Counter('db_pool_checkouts', 'Pool checkouts', ['alias'])
+POOL_WAITS = Counter('db_pool_waits', 'Pool checkouts that had to wait', ['alias'])
+POOL_WAIT_TIME = Counter('db_pool_wait_seconds', 'Time spent waiting on the pool', ['alias'])
+POOL_TIMEOUTS = Counter('db_pool_timeouts', 'Pool checkouts that timed out', ['alias'])
+
+_pool_counters = (
+    (POOL_CHECKOUTS, 'checkouts'),
+    (POOL_WAITS, 'waits'),
+    (POOL_WAIT_TIME, 'wait_time_seconds'),
+    (POOL_TIMEOUTS, 'timeouts'),
+)
+_last_pool_stats = {}
+
+
+def record_pool_stats():
+    """
+    Publish the connection pool stats of this process. The pools keep
+    running totals, so only what changed since the last call is added to
+    the counters, which keeps them summable across workers.
+    """
+    for alias, stats in pool_stats().items():
+        last = _last_pool_stats.get(alias, {})
+        for counter, key in _pool_counters:
+            delta = stats[key] - last.get(key, 0)
+            if delta > 0:
+                counter.labels(alias).inc(delta)
+        POOL_CONNECTIONS.labels(alias, 'in_use').set(stats['in_use'])
+        POOL_CONNECTIONS.labels(alias, 'idle').set(stats['idle'])
+        _last_pool_stats[alias] = stats
+
+
+def render_metrics():
+    """ The Prometheus text exposition of every worker's metrics """
+    if os.environ.get(MULTIPROCESS_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    if os.environ.get(MULTIPROCESS_DIR_ENV):
+        multiprocess.mark_process_dead(pid)
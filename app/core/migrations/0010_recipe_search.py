@@ -0,0 +1,66 @@
+# Generated by Django 2.1.15 on 2026-10-18 16:48
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    'CREATE INDEX core_recipe_search_vector_idx ON core_recipe USING GIN (search_vector)',
+    "CREATE TRIGGER core_recipe_search_vector_update "
+    "BEFORE INSERT OR UPDATE OF title ON core_recipe "
+    "FOR EACH ROW EXECUTE PROCEDURE "
+    "tsvector_update_trigger(search_vector, 'pg_catalog.english', title)",
+    "UPDATE core_recipe SET search_vector = to_tsvector('pg_catalog.english', title)",
+]
+
+POSTGRES_REVERSE = [
+    'DROP TRIGGER IF EXISTS core_recipe_search_vector_update ON core_recipe',
+    'DROP INDEX IF EXISTS core_recipe_search_vector_idx',
+]
+
+# SQLite has no tsvector, so keep an FTS5 shadow table keyed by recipe id
+# instead. Its rows are written by core.search from the Recipe signals, which
+# unlike triggers survive SQLite's table rebuilds in later migrations.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE core_recipe_fts USING fts5(title, tokenize='porter')",
+    'INSERT INTO core_recipe_fts(rowid, title) SELECT id, title FROM core_recipe',
+]
+
+SQLITE_REVERSE = [
+    'DROP TABLE IF EXISTS core_recipe_fts',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {
+        'postgresql': POSTGRES_FORWARD,
+        'sqlite': SQLITE_FORWARD,
+    })
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {
+        'postgresql': POSTGRES_REVERSE,
+        'sqlite': SQLITE_REVERSE,
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_relation_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
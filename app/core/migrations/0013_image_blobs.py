@@ -0,0 +1,62 @@
+# Generated by Django 2.1.15 on 2026-10-18 16:58
+
+import hashlib
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def backfill_blobs(apps, schema_editor):
+    """
+    Give the images uploaded before content addressing a blob under their
+    existing (uuid) name, so releasing them later deletes the file.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    ImageBlob = apps.get_model('core', 'ImageBlob')
+
+    names = Counter(
+        Recipe.objects.exclude(image='').exclude(image__isnull=True)
+        .values_list('image', flat=True)
+    )
+    for name, refcount in names.items():
+        if not default_storage.exists(name):
+            continue
+
+        hasher = hashlib.sha256()
+        with default_storage.open(name) as f:
+            for chunk in f.chunks():
+                hasher.update(chunk)
+
+        # Legacy duplicates keep their own file, keyed by a per-name digest
+        digest = hasher.hexdigest()
+        if ImageBlob.objects.filter(digest=digest).exists():
+            digest = hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+        ImageBlob.objects.create(
+            digest=digest,
+            name=name,
+            size=default_storage.size(name),
+            refcount=refcount
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveIntegerField()),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,364 @@
+import time
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core import cache as response_cache
+from core.renderers import ORJSONRenderer
+
+
+class EnvelopeResponseMixin(object):
+    """
+    Wrap the responses of the DRF generic views in the
+    {'status', 'message', 'data'} envelope used across the api.
+
+    Each action serializes its rows exactly once, like the matching DRF
+    mixin, and times it: the envelope carries the time spent in
+    `serializer.data` as `serialize_seconds`, which the metrics middleware
+    records. Paginated lists add the paginator's `next`/`previous` links
+    next to `data`.
+    """
+    list_message = 'Records retrieved successfully'
+    create_message = 'Record created successfully'
+    retrieve_message = 'Record retrieved successfully'
+    update_message = 'Record updated successfully'
+    destroy_message = 'Record deleted successfully'
+
+    def envelope(self, message, data=None, status_code=status.HTTP_200_OK, **extra):
+        response = {
+            'status': status_code,
+            'message': message,
+        }
+        if data is not None:
+            response['data'] = data
+        response.update(extra)
+
+        response = Response(response, status=status_code)
+        response.serialize_seconds = getattr(self, 'serialize_seconds', None)
+
+        return response
+
+    def serialize(self, serializer):
+        started = time.perf_counter()
+        data = serializer.data
+        self.serialize_seconds = time.perf_counter() - started
+
+        return data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            serializer = self.get_serializer(queryset, many=True)
+            return self.envelope(self.list_message, self.serialize(serializer))
+
+        serializer = self.get_serializer(page, many=True)
+        return self.envelope(
+            self.list_message,
+            self.serialize(serializer),
+            **self.paginator.get_page_links()
+        )
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+
+        return self.envelope(
+            self.create_message,
+            self.serialize(serializer),
+            status.HTTP_201_CREATED
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        return self.envelope(self.retrieve_message, self.serialize(serializer))
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+
+        if getattr(instance, '_prefetched_objects_cache', None):
+            # Serialize the updated relations, not the ones prefetched
+            instance._prefetched_objects_cache = {}
+
+        return self.envelope(self.update_message, self.serialize(serializer))
+
+    def destroy(self, request, *args, **kwargs):
+        super(EnvelopeResponseMixin, self).destroy(request, *args, **kwargs)
+        return self.envelope(self.destroy_message)
+
+
+class StreamingListMixin(object):
+    """
+    Opt-in streaming for list views, enabled with `?stream=1`.
+
+    Rows are pulled with `QuerySet.iterator()` (a server-side cursor on
+    PostgreSQL), prefetched and serialized one chunk at a time, and the
+    envelope is written out incrementally through a StreamingHttpResponse,
+    so worker memory stays flat however many rows come back.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        if not self.should_stream(request):
+            return super(StreamingListMixin, self).list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = getattr(self, 'keyset_ordering', None)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+
+        response = StreamingHttpResponse(
+            self.stream_envelope(queryset),
+            content_type='application/json'
+        )
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+    def should_stream(self, request):
+        value = request.query_params.get(self.stream_query_param, '')
+        return value.lower() in ('1', 'true', 'yes')
+
+    def get_stream_renderer(self):
+        for renderer in self.get_renderers():
+            if renderer.format == 'json':
+                return renderer
+
+        return ORJSONRenderer()
+
+    def stream_chunks(self, queryset):
+        lookups = queryset._prefetch_related_lookups
+        chunk = []
+        for instance in queryset.iterator(chunk_size=self.stream_chunk_size):
+            chunk.append(instance)
+            if len(chunk) == self.stream_chunk_size:
+                prefetch_related_objects(chunk, *lookups)
+                yield chunk
+                chunk = []
+
+        if chunk:
+            prefetch_related_objects(chunk, *lookups)
+            yield chunk
+
+    def stream_envelope(self, queryset):
+        renderer = self.get_stream_renderer()
+        head = renderer.render({
+            'status': status.HTTP_200_OK,
+            'message': self.list_message,
+        })
+
+        yield head[:-1] + b',"data":['
+        separator = b''
+        for chunk in self.stream_chunks(queryset):
+            serializer = self.get_serializer(chunk, many=True)
+            for item in serializer.data:
+                yield separator + renderer.render(item)
+                separator = b','
+
+        yield b']}'
+
+
+class UserScopedMixin(object):
+    """
+    Limit a view to the rows owned by the requesting user and stamp new
+    rows with that user, so every query is a range scan on the
+    (user, ...) composite indexes instead of a scan over every tenant.
+    """
+
+    def get_queryset(self):
+        queryset = super(UserScopedMixin, self).get_queryset()
+        return queryset.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class SparseFieldsMixin(object):
+    """
+    Sparse fieldsets on reads, e.g. `?fields=id,title`: only the listed
+    serializer fields are rendered, only their columns are loaded with
+    `.only()`, and serializers can leave out the prefetches of relations
+    that weren't asked for (see `get_sparse_fields`). Writes always take
+    and return every field.
+
+    A field whose source isn't a model field can name the columns it
+    reads in a `model_fields` attribute; without one the queryset is left
+    unnarrowed.
+    """
+    fields_query_param = 'fields'
+
+    def get_sparse_fields(self):
+        """
+        The requested serializer fields by name, in the serializer's
+        order, or None when every field is rendered.
+        """
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = self._parse_sparse_fields()
+
+        return self._sparse_fields
+
+    def _parse_sparse_fields(self):
+        value = self.request.query_params.get(self.fields_query_param, '')
+        requested = {name.strip() for name in value.split(',') if name.strip()}
+        if self.request.method not in ('GET', 'HEAD') or not requested:
+            return None
+
+        serializer_class = self.get_serializer_class()
+        fields = serializer_class(context=self.get_serializer_context()).fields
+        unknown = sorted(requested.difference(fields))
+        if unknown:
+            raise ValidationError({
+                self.fields_query_param: [
+                    _('Unknown fields: {names}. Expected any of: {choices}.').format(
+                        names=', '.join(unknown),
+                        choices=', '.join(fields)
+                    )
+                ]
+            })
+
+        return OrderedDict(
+            (name, field) for name, field in fields.items() if name in requested
+        )
+
+    def get_sparse_columns(self, model, fields):
+        """
+        The model fields to load for `fields`, or None when one of them
+        reads something other than model fields. Relations to many rows
+        are left to the prefetches.
+        """
+        columns = [model._meta.pk.name]
+        concrete = {field.name for field in model._meta.concrete_fields}
+        for name in getattr(self, 'keyset_ordering', None) or ():
+            # Read back from the last row for the cursor, unless it is an
+            # annotation, like the search rank
+            name = name.lstrip('-')
+            if name in concrete:
+                columns.append(name)
+
+        for field in fields.values():
+            if hasattr(field, 'model_fields'):
+                names = field.model_fields
+            elif field.source == '*':
+                return None
+            else:
+                names = [field.source.split('.')[0]]
+
+            for name in names:
+                try:
+                    model_field = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    return None
+                if model_field.concrete and not model_field.many_to_many:
+                    columns.append(model_field.name)
+
+        return list(OrderedDict.fromkeys(columns))
+
+    def get_queryset(self):
+        queryset = super(SparseFieldsMixin, self).get_queryset()
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+
+        columns = self.get_sparse_columns(queryset.model, fields)
+        if columns is None:
+            return queryset
+
+        return queryset.only(*columns)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super(SparseFieldsMixin, self).get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            child = getattr(serializer, 'child', serializer)
+            for name in list(child.fields):
+                if name not in fields:
+                    child.fields.pop(name)
+
+        return serializer
+
+
+class CachedResponseMixin(object):
+    """
+    Serve repeated list/retrieve reads of a user's data from the
+    `responses` cache. Keys carry the user's namespace version, which any
+    write to their recipes, tags or ingredients bumps (see core.signals),
+    so stale entries are simply never read again.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response('list', request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response('retrieve', request, *args, **kwargs)
+
+    def cached_response(self, action, request, *args, **kwargs):
+        key = response_cache.response_cache_key(
+            request.user.pk,
+            self.__class__.__name__,
+            request.build_absolute_uri()
+        )
+        data = response_cache.get_response(key)
+        if data is not None:
+            return Response(data)
+
+        handler = getattr(super(CachedResponseMixin, self), action)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response_cache.set_response(key, response.data)
+
+        return response
+
+
+class BulkCreateMixin(object):
+    """
+    Create a JSON array of items in one request. The whole array is
+    validated in a single pass, errors are reported per item in the same
+    order as the input, and the rows are inserted in one transaction by
+    the serializer's `list_serializer_class`.
+    """
+    bulk_max_items = 1000
+
+    def get_serializer(self, *args, **kwargs):
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+
+        return super(BulkCreateMixin, self).get_serializer(*args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [_('Expected a list of items.')]
+            })
+
+        if len(request.data) > self.bulk_max_items:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    _('Ensure there are no more than {max_items} items.').format(
+                        max_items=self.bulk_max_items
+                    )
+                ]
+            })
+
+        with transaction.atomic():
+            response = super(BulkCreateMixin, self).create(request, *args, **kwargs)
+
+        # bulk_create() sends no post_save, so invalidate cached reads here
+        response_cache.bump_user_version(request.user.pk)
+
+        return response
@@ -1,20 +1,57 @@
-import uuid
+import hashlib
+import json
 import os
 
-from django.db import models
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser, PermissionsMixin
 from django.conf import settings
 
 # Create your models here.
 
-def recipe_image_file_path(instance, filename):
-    ext = filename.split('.')[-1]
-    filename = f'{uuid.uuid4()}.{ext}'
+def file_digest(file):
+    """
+    The sha256 of `file`, as computed while the upload streamed in (see
+    core.uploads) or by reading it in chunks otherwise.
+    """
+    digest = getattr(file, 'sha256', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in file.chunks():
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+        
+    return digest
+
+
+def content_file_path(digest, filename):
+    ext = filename.split('.')[-1].lower()
     
-    return os.path.join('uploads/recipe/', filename)
+    return os.path.join('uploads/recipe/', digest[:2], f'{digest}.{ext}')
 
 
-class UserManager(BaseUserManager):
+def recipe_image_file_path(instance, filename):
+    return content_file_path(file_digest(instance.image.file), filename)
+
+
+class UserQuerySet(models.QuerySet):
+    
+    def update(self, **kwargs):
+        # No post_save for bulk updates, so drop the cached users here,
+        # or a deactivation would go unnoticed until the cache expires
+        from user.authentication import invalidate_user
+        
+        pks = list(self.values_list('pk', flat=True))
+        rows = super(UserQuerySet, self).update(**kwargs)
+        for pk in pks:
+            invalidate_user(pk)
+            
+        return rows
+    
+    
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -40,6 +77,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=128)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    token_generation = models.PositiveIntegerField(default=0)
     
     objects = UserManager()
     
@@ -48,10 +86,21 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
     
+    def revoke_tokens(self):
+        """ Invalidate every signed token issued to the user so far """
+        self.token_generation = models.F('token_generation') + 1
+        self.save(update_fields=['token_generation'])
+        self.refresh_from_db(fields=['token_generation'])
+    
 class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='core_tag_user_name_idx'),
+        ]
+    
     def __str__(self):
         return self.name
     
@@ -60,6 +109,11 @@ class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='core_ingredient_user_name_idx'),
+        ]
+    
     def __str__(self):
         return self.name
     
@@ -73,6 +127,85 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Maintained by a database trigger, see migration 0010_recipe_search
+    search_vector = SearchVectorField(null=True, editable=False)
+    # JSON list of the resized copies of `image`, see core.thumbnails
+    image_variants = models.TextField(blank=True, default='', editable=False)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='core_recipe_user_id_idx'),
+        ]
     
     def __str__(self):
-        return self.title        
+        return self.title
+
+    @property
+    def thumbnails(self):
+        return json.loads(self.image_variants) if self.image_variants else []
+
+
+class ImageBlobManager(models.Manager):
+    
+    def acquire(self, file):
+        """
+        Take a reference on the stored copy of `file`, storing it first if
+        no identical file has been uploaded before, and return its blob.
+        """
+        digest = file_digest(file)
+        with transaction.atomic():
+            blob = self.select_for_update().filter(digest=digest).first()
+            if blob is not None:
+                self.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+                return blob
+            
+            name = content_file_path(digest, file.name)
+            saved = default_storage.save(name, file)
+            if saved != name:
+                # The same content is already on disk under its own name
+                default_storage.delete(saved)
+                
+            try:
+                with transaction.atomic():
+                    return self.create(digest=digest, name=name, size=file.size, refcount=1)
+            except IntegrityError:
+                pass
+            
+        # Another upload of the same file created the blob first
+        return self.acquire(file)
+    
+    def release(self, name):
+        """
+        Drop a reference on the blob stored under `name`, deleting the
+        file and its resized variants with the last reference.
+        """
+        from core.thumbnails import delete_variants
+        
+        with transaction.atomic():
+            blob = self.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            
+            if blob.refcount > 1:
+                self.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+                return
+            
+            blob.delete()
+            default_storage.delete(name)
+            delete_variants(name)
+
+
+class ImageBlob(models.Model):
+    """
+    A stored recipe image, named after the sha256 of its content and
+    shared by every recipe that uploaded the same file.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    
+    objects = ImageBlobManager()
+    
+    def __str__(self):
+        return self.name
@@ -0,0 +1,177 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the view's `keyset_ordering`.
+
+    Instead of an OFFSET the cursor carries the ordering values of the
+    last row served, and the next page is fetched with a
+    `WHERE (key) < (last key) ORDER BY key LIMIT n` range condition. On a
+    user scoped queryset that is an index range scan on (user_id, key), so
+    page one thousand costs the same as page one.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = getattr(settings, 'API_PAGE_SIZE', 100)
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 1000)
+    ordering = ('-id',)
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.base_url = request.build_absolute_uri()
+
+        values, reverse = self.decode_cursor(request, queryset)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._invert(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(ordering, values))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = values is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+
+        return self.page_size
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_page_links(self):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+
+    def get_paginated_response(self, data):
+        response = self.get_page_links()
+        response['data'] = data
+
+        return Response(response)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            values = cursor['v']
+            reverse = bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return self.clean_cursor_values(queryset, values), reverse
+
+    def clean_cursor_values(self, queryset, values):
+        """
+        Convert the cursor values to their ordering fields' types, so a
+        hand-edited cursor is a 404 rather than an error in the query.
+        """
+        cleaned = []
+        for field, value in zip(self.ordering, values):
+            if value is None or not isinstance(value, (str, int, float)):
+                raise NotFound(self.invalid_cursor_message)
+
+            try:
+                cleaned.append(self._ordering_field(queryset, field).to_python(value))
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+
+        return cleaned
+
+    def encode_cursor(self, instance, reverse):
+        values = [getattr(instance, field.lstrip('-')) for field in self.ordering]
+        cursor = {'v': values}
+        if reverse:
+            cursor['r'] = 1
+
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(cursor, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii').rstrip('=')
+
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _ordering_field(self, queryset, field):
+        name = field.lstrip('-')
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _invert(self, field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    def _seek_filter(self, ordering, values):
+        """
+        Expand the row comparison `(a, b) > (x, y)` into
+        `a > x OR (a = x AND b > y)`, which every backend can answer from a
+        composite index.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{'%s__%s' % (name, lookup): value})
+            equal &= Q(**{name: value})
+
+        return condition
@@ -0,0 +1,40 @@
+import io
+
+import orjson
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+
+# orjson reads integers beyond 64 bits as floats, where the stdlib keeps
+# them exact. Any run of 19 digits, even inside a string, sends the body
+# through the stdlib parser instead. Zeroing every digit and looking for
+# 19 zeros is an order of magnitude faster than a regex.
+_ZERO_DIGITS = bytes.maketrans(b'0123456789', b'0' * 10)
+_LONG_INTEGER = b'0' * 19
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser that decodes with orjson, returning the same data as DRF's
+    parser about twice as fast.
+
+    Bodies orjson rejects are re-parsed by DRF's parser, so anything the
+    stdlib accepts still goes through and errors keep their usual
+    "JSON parse error - ..." message. Non UTF-8 request encodings and
+    STRICT_JSON = False use DRF's parser throughout.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if not self.strict or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super(ORJSONParser, self).parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if _LONG_INTEGER not in body.translate(_ZERO_DIGITS):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+
+        return super(ORJSONParser, self).parse(io.BytesIO(body), media_type, parser_context)
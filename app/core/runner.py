@@ -0,0 +1,22 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from core.cache import isolated_caches
+
+
+class LocalCacheTestRunner(DiscoverRunner):
+    """
+    Run the tests on in-process caches whatever CACHE_BACKEND says. The
+    tests clear the caches and cache their users under the same
+    auth:user:<pk> keys as real users, which on a shared memcached would
+    log everybody out and hand out the test users instead.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super(LocalCacheTestRunner, self).setup_test_environment(**kwargs)
+        self.local_caches = override_settings(CACHES=isolated_caches('test'))
+        self.local_caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.local_caches.disable()
+        super(LocalCacheTestRunner, self).teardown_test_environment(**kwargs)
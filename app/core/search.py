@@ -0,0 +1,128 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, IntegerField, Value
+from django.db.models.functions import Cast
+from django.db.models.expressions import RawSQL
+
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'core_recipe_fts'
+
+# Ranks are scaled and rounded to integers in SQL. Pagination cursors
+# carry the rank of the last row, and a float would not survive the trip
+# through JSON exactly: PostgreSQL's ts_rank is a `real`, sent back with
+# six significant digits, so `rank = <cursor value>` would never match
+# and rows tied on rank would be skipped or repeated.
+RANK_SCALE = 1000000
+
+
+def _terms(text):
+    return re.findall(r'\w+', text or '')
+
+
+def search_recipes(queryset, text):
+    """
+    Filter `queryset` to the recipes whose title matches every word of
+    `text` and annotate each with an integer `rank`, higher being more
+    relevant.
+
+    PostgreSQL uses the stored `search_vector` column and its GIN index.
+    SQLite uses the `core_recipe_fts` FTS5 table and its bm25 score, so
+    search works locally without a PostgreSQL server.
+    """
+    terms = _terms(text)
+    if not terms:
+        # Still annotated, since the list view orders any `?q=` by rank
+        return queryset.annotate(rank=Value(0, output_field=IntegerField())).none()
+
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(' '.join(terms), config=SEARCH_CONFIG)
+        rank = SearchRank(F('search_vector'), query)
+        return queryset.filter(search_vector=query).annotate(rank=Cast(
+            Cast(rank, FloatField()) * Value(RANK_SCALE, output_field=FloatField()),
+            IntegerField()
+        ))
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join('"%s"' % term for term in terms)
+        return queryset.extra(
+            where=[f'core_recipe.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'],
+            params=[match]
+        ).annotate(rank=RawSQL(
+            f'SELECT CAST(-bm25({FTS_TABLE}) * {RANK_SCALE} AS INTEGER) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = core_recipe.id',
+            (match,),
+            output_field=IntegerField()
+        ))
+
+    for term in terms:
+        queryset = queryset.filter(title__icontains=term)
+
+    return queryset.annotate(rank=Value(RANK_SCALE, output_field=IntegerField()))
+
+
+def index_recipe(recipe):
+    """ Refresh the SQLite shadow row of a saved recipe """
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, title) VALUES (%s, %s)',
+            [recipe.pk, recipe.title]
+        )
+
+
+def index_recipes(recipes):
+    """ Add the SQLite shadow rows of recipes inserted without signals """
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE}(rowid, title) VALUES (%s, %s)',
+            [(recipe.pk, recipe.title) for recipe in recipes]
+        )
+
+
+def unindex_recipe(recipe_id):
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id])
+
+
+def autocomplete(queryset, text, limit):
+    """
+    Return up to `limit` rows of a Tag or Ingredient `queryset` whose name
+    starts with or resembles `text`, most similar first.
+
+    PostgreSQL matches prefixes (ILIKE) and typos (pg_trgm's word
+    similarity operator) from the (user_id, name) trigram GIN index.
+    Other backends fall back to a case-sensitive prefix range scan on the
+    (user, name, id) index.
+    """
+    text = (text or '').strip()
+    if not text:
+        return queryset.none()
+
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        prefix = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return queryset.extra(
+            where=[f'(%s <%% {table}.name OR {table}.name ILIKE %s)'],
+            params=[text, prefix]
+        ).annotate(similarity=RawSQL(
+            f'word_similarity(%s, {table}.name)',
+            (text,),
+            output_field=FloatField()
+        )).order_by('-similarity', 'name', 'id')[:limit]
+
+    return queryset.filter(
+        name__gte=text,
+        name__lt=text + '\U0010ffff'
+    ).order_by('name', 'id')[:limit]
@@ -1,7 +1,13 @@
-from django.test import TestCase, Client
+import tempfile
+
+from PIL import Image
+
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from core.models import Recipe, Tag, Ingredient, ImageBlob
+
 
 class AdminSiteTestCase(TestCase):
     
@@ -35,4 +41,74 @@ class AdminSiteTestCase(TestCase):
         url = reverse('admin:core_user_add')
         response = self.client.get(url)
         
-        self.assertEqual(response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(response.status_code, 200)
+        
+        
+@override_settings(THUMBNAIL_WORKERS=0)
+class AdminRecipeImageTestCase(TestCase):
+    
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email = "josekangethe2@gmail.com",
+            password = "test@123"
+        )
+        self.client.force_login(self.admin_user)
+        self.tag = Tag.objects.create(user=self.admin_user, name='Dinner')
+        self.ingredient = Ingredient.objects.create(user=self.admin_user, name='Rice')
+        self.recipes = [
+            Recipe.objects.create(user=self.admin_user, title=title, time_minutes=10, price=5)
+            for title in ('Pilau', 'Biryani')
+        ]
+        
+    def tearDown(self):
+        for recipe in Recipe.objects.exclude(image=''):
+            ImageBlob.objects.release(recipe.image.name)
+            
+    def save_recipe(self, recipe, **extra):
+        url = reverse('admin:core_recipe_change', args=[recipe.id])
+        payload = {
+            'user': self.admin_user.id,
+            'title': recipe.title,
+            'time_minutes': 10,
+            'price': '5.00',
+            'link': '',
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        }
+        payload.update(extra)
+        
+        return self.client.post(url, payload)
+        
+    def upload_image(self, recipe, color='black'):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10), color).save(ntf, format='JPEG')
+            ntf.seek(0)
+            return self.save_recipe(recipe, image=ntf)
+        
+    def test_admin_uploads_share_blobs(self):
+        for recipe in self.recipes:
+            response = self.upload_image(recipe)
+            self.assertEqual(response.status_code, 302)
+            
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.image.name, blob.name)
+            
+    def test_admin_replace_releases_image(self):
+        for recipe in self.recipes:
+            self.upload_image(recipe)
+        old = ImageBlob.objects.get()
+        
+        self.upload_image(self.recipes[0], color='white')
+        
+        old.refresh_from_db()
+        self.assertEqual(old.refcount, 1)
+        self.assertEqual(ImageBlob.objects.count(), 2)
+        
+        self.upload_image(self.recipes[1], color='white')
+        
+        self.assertEqual(ImageBlob.objects.get().refcount, 2)
+        self.assertFalse(self.recipes[1].image.storage.exists(old.name))
@@ -1,21 +1,188 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from django.core.cache import caches
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core import seed
+from core.management.commands import bench, serve
 
 
 class CommandTests(TestCase):
     
     def test_wait_for_db_ready(self):
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch('core.management.commands.wait_for_db.ping') as ping:
+            ping.return_value = 0.001
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ping.call_count, 1)
+            
+    def test_wait_for_db_queries_database(self):
+        """ Test the command runs a real query rather than just a lookup """
+        with CaptureQueriesContext(connection) as queries:
+            call_command('wait_for_db', stdout=StringIO())
+            
+        self.assertEqual([query['sql'] for query in queries], ['SELECT 1'])
             
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
\ No newline at end of file
+        with patch('core.management.commands.wait_for_db.ping') as ping:
+            ping.side_effect = [OperationalError] * 5 + [0.001]
+            call_command('wait_for_db', '--initial-delay', '1', '--max-delay', '4', stdout=StringIO())
+            self.assertEqual(ping.call_count, 6)
+            
+        waits = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(len(waits), 5)
+        for wait, delay in zip(waits, [1, 2, 4, 4, 4]):
+            self.assertGreaterEqual(wait, delay / 2)
+            self.assertLessEqual(wait, delay)
+            
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        with patch('core.management.commands.wait_for_db.ping') as ping, \
+                patch('time.monotonic', side_effect=[0, 1, 2, 11]):
+            ping.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', '--timeout', '10', stdout=StringIO())
+                
+        self.assertEqual(ping.call_count, 3)
+        
+    @patch('core.management.commands.serve.process_local_caches', return_value=[])
+    @patch('core.management.commands.serve.prepare_metrics_dir')
+    @patch('core.management.commands.serve.WSGIServer')
+    def test_serve_options(self, server, prepare_metrics_dir, process_local_caches):
+        call_command('serve', '--bind', '127.0.0.1:9000', '--workers', '3', '--max-requests', '50')
+        
+        options = server.call_args[0][0]
+        self.assertEqual(options['bind'], '127.0.0.1:9000')
+        self.assertEqual(options['workers'], 3)
+        self.assertEqual(options['max_requests'], 50)
+        self.assertTrue(options['preload_app'])
+        self.assertTrue(server.return_value.run.called)
+        self.assertTrue(prepare_metrics_dir.called)
+        
+    @patch('core.management.commands.serve.prepare_metrics_dir')
+    @patch('core.management.commands.serve.WSGIServer')
+    def test_serve_requires_shared_caches(self, server, prepare_metrics_dir):
+        self.assertEqual(serve.process_local_caches(), ['auth', 'responses'])
+        
+        with self.assertRaisesMessage(CommandError, 'auth, responses cache must be shared'):
+            call_command('serve', '--workers', '3')
+        self.assertFalse(server.called)
+        
+        call_command('serve', '--workers', '1')
+        self.assertTrue(server.return_value.run.called)
+        
+    def test_serve_prepares_metrics_dir(self):
+        with tempfile.TemporaryDirectory() as path, \
+                patch.dict('os.environ', {'PROMETHEUS_MULTIPROC_DIR': path}):
+            stale = os.path.join(path, 'histogram_123.db')
+            open(stale, 'w').close()
+            
+            self.assertEqual(serve.prepare_metrics_dir(), path)
+            self.assertFalse(os.path.exists(stale))
+        
+    @patch.dict('os.environ', {}, clear=True)
+    @patch('os.sched_getaffinity', return_value={0, 1, 2, 3})
+    def test_serve_workers_from_cpus(self, affinity):
+        self.assertEqual(serve.default_workers(), 9)
+        
+        with patch.dict('os.environ', {'WEB_CONCURRENCY': '4'}):
+            self.assertEqual(serve.default_workers(), 4)
+            
+    def test_serve_server_config(self):
+        server = serve.WSGIServer({'workers': 2, 'max_requests': 10, 'preload_app': True})
+        
+        self.assertEqual(server.cfg.workers, 2)
+        self.assertEqual(server.cfg.max_requests, 10)
+        self.assertTrue(callable(server.load()))
+        
+        
+class BenchCommandTests(TestCase):
+    
+    def run_bench(self, *args):
+        with tempfile.NamedTemporaryFile('r', suffix='.json') as output:
+            call_command(
+                'bench', '--existing-db', '--users', '1', '--recipes', '3', '--tags', '3',
+                '--ingredients', '3', '--requests', '2', '--warmup', '0',
+                '--output', output.name, *args, stderr=StringIO()
+            )
+            return json.load(output)
+        
+    def test_every_route_has_a_scenario(self):
+        user = seed.seed(1, 1, 1, 1)[0]
+        
+        self.assertEqual(bench.uncovered_routes(bench.build_scenarios(user)), [])
+        
+    def test_bench_report(self):
+        report = self.run_bench('--only', 'recipe-list', 'recipe-create', 'me')
+        
+        self.assertEqual(set(report['results']), {'recipe-list', 'recipe-create', 'me'})
+        result = report['results']['recipe-list']
+        self.assertEqual(result['route'], 'recipe:recipe-list')
+        self.assertEqual(result['requests'], 2)
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(result['queries']['max'], 3)
+        self.assertEqual(report['dataset']['recipes'], 3)
+        
+    def test_bench_writes_are_rolled_back(self):
+        user = seed.seed(1, 3, 3, 3)[0]
+        recipes = user.recipe_set.count()
+        
+        self.run_bench('--only', 'recipe-create', 'recipe-delete')
+        
+        self.assertEqual(user.recipe_set.count(), recipes)
+        
+    def test_bench_leaves_the_configured_caches_alone(self):
+        for alias in ('auth', 'responses'):
+            caches[alias].set('bench-sentinel', alias)
+            
+        self.run_bench('--only', 'recipe-list', 'me')
+        
+        for alias in ('auth', 'responses'):
+            self.assertEqual(caches[alias].get('bench-sentinel'), alias)
+            
+    def test_bench_fails_on_regression(self):
+        report = self.run_bench('--only', 'me')
+        report['results']['me'].update({'p50_ms': 1000, 'p95_ms': 1000})
+        report['results']['me']['queries']['max'] = -1
+        
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as baseline:
+            json.dump(report, baseline)
+            baseline.flush()
+            with self.assertRaisesMessage(CommandError, '1 regression(s)'):
+                self.run_bench('--only', 'me', '--baseline', baseline.name)
+                
+    def test_compare(self):
+        def result(p50, p95, queries):
+            return {'p50_ms': p50, 'p95_ms': p95, 'queries': {'max': queries}}
+        
+        baseline = {'results': {
+            'slower': result(10, 20, 3),
+            'noise': result(0.1, 0.2, 3),
+            'queries': result(10, 20, 3),
+        }}
+        regressions = bench.compare({
+            'slower': result(10, 30, 3),
+            'noise': result(0.3, 0.4, 3),
+            'queries': result(10, 20, 4),
+            'new': result(10, 20, 3),
+        }, baseline, threshold=0.2, min_delta_ms=0.5)
+        
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('slower: p95_ms'))
+        self.assertTrue(regressions[1].startswith('queries: 3 -> 4'))
+        
+    def test_percentile(self):
+        values = list(range(1, 101))
+        
+        self.assertEqual(bench.percentile(values, 50), 50)
+        self.assertEqual(bench.percentile(values, 99), 99)
+        self.assertEqual(bench.percentile([7], 95), 7)
@@ -0,0 +1,217 @@
+import sqlite3
+import threading
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase
+
+from core.db import pool as db_pool
+from core.db.pool import ConnectionPool, PoolTimeout
+from core.db.wrappers import HealthCheckMixin, PooledConnectionMixin
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_idle_connection_is_reused(self):
+        pool = ConnectionPool(Mock, max_size=2, timeout=1)
+
+        first = pool.checkout()
+        pool.checkin(first)
+
+        self.assertIs(pool.checkout(), first)
+        self.assertEqual(pool.stats()['connects'], 1)
+        self.assertEqual(pool.stats()['checkouts'], 2)
+
+    def test_checkout_times_out_when_exhausted(self):
+        pool = ConnectionPool(Mock, max_size=1, timeout=0.01)
+        pool.checkout()
+
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    def test_waiting_thread_gets_returned_connection(self):
+        pool = ConnectionPool(Mock, max_size=1, timeout=5)
+        connection = pool.checkout()
+        received = []
+
+        waiter = threading.Thread(target=lambda: received.append(pool.checkout()))
+        waiter.start()
+        while not pool._condition._waiters:
+            pass
+        pool.checkin(connection)
+        waiter.join()
+
+        self.assertEqual(received, [connection])
+        self.assertEqual(pool.stats()['waits'], 1)
+        self.assertGreater(pool.stats()['max_wait_time_seconds'], 0)
+
+    def test_invalid_idle_connection_is_replaced(self):
+        pool = ConnectionPool(Mock, max_size=1, timeout=1, validate=lambda c: False)
+        stale = pool.checkout()
+        pool.checkin(stale)
+
+        fresh = pool.checkout()
+
+        self.assertIsNot(fresh, stale)
+        self.assertTrue(stale.close.called)
+        self.assertEqual(pool.stats()['discarded'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_discarded_and_failed_connections_free_their_slot(self):
+        connect = Mock(side_effect=[Mock(), Exception('refused'), Mock()])
+        pool = ConnectionPool(connect, max_size=1, timeout=0.01)
+
+        pool.checkin(pool.checkout(), discard=True)
+        with self.assertRaises(Exception):
+            pool.checkout()
+
+        self.assertEqual(pool.stats()['size'], 0)
+        pool.checkout()
+
+    def test_forked_process_gets_its_own_pool(self):
+        with patch.dict(db_pool._pools, clear=True):
+            parent = db_pool.get_pool(('default',), Mock, 1, 1)
+            self.assertIs(db_pool.get_pool(('default',), Mock, 1, 1), parent)
+
+            with patch('os.getpid', return_value=parent.pid + 1):
+                child = db_pool.get_pool(('default',), Mock, 1, 1)
+
+            self.assertIsNot(child, parent)
+            self.assertIn('default', db_pool.pool_stats())
+
+
+class FakeWrapper(object):
+    """ Just enough of BaseDatabaseWrapper to drive the mixins """
+
+    def __init__(self, usable=True, settings_dict=None):
+        self.alias = 'default'
+        self.settings_dict = settings_dict or {}
+        self.connection = None
+        self.in_atomic_block = False
+        self.usable = usable
+        self.connects = 0
+
+    def get_new_connection(self, conn_params):
+        self.connects += 1
+        return Mock()
+
+    def ensure_connection(self):
+        if self.connection is None:
+            self.connection = self.get_new_connection({})
+
+    def is_usable(self):
+        return self.usable
+
+    def close_if_unusable_or_obsolete(self):
+        pass
+
+    def _close(self):
+        self.connection.close()
+
+    def close(self):
+        self._close()
+        self.connection = None
+
+
+class HealthCheckedWrapper(HealthCheckMixin, FakeWrapper):
+    pass
+
+
+class PooledWrapper(PooledConnectionMixin, FakeWrapper):
+
+    def validate_pooled_connection(self, connection):
+        return True
+
+
+class DefaultValidationWrapper(PooledConnectionMixin, FakeWrapper):
+    Database = sqlite3
+
+
+class HealthCheckTests(SimpleTestCase):
+
+    def test_dead_connection_is_replaced_at_request_start(self):
+        wrapper = HealthCheckedWrapper(usable=False)
+        wrapper.ensure_connection()
+        wrapper.close_if_unusable_or_obsolete()
+
+        wrapper.ensure_connection()
+
+        self.assertEqual(wrapper.connects, 2)
+
+    def test_checked_once_per_request(self):
+        wrapper = HealthCheckedWrapper()
+        wrapper.ensure_connection()
+        wrapper.close_if_unusable_or_obsolete()
+
+        with patch.object(wrapper, 'is_usable', return_value=True) as is_usable:
+            wrapper.ensure_connection()
+            wrapper.ensure_connection()
+
+        self.assertEqual(is_usable.call_count, 1)
+        self.assertEqual(wrapper.connects, 1)
+
+    def test_not_checked_inside_atomic_block(self):
+        wrapper = HealthCheckedWrapper(usable=False)
+        wrapper.ensure_connection()
+        wrapper.close_if_unusable_or_obsolete()
+        wrapper.in_atomic_block = True
+
+        wrapper.ensure_connection()
+
+        self.assertEqual(wrapper.connects, 1)
+
+
+class PooledConnectionTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = patch.dict(db_pool._pools, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pooled_wrapper(self):
+        return PooledWrapper(settings_dict={
+            'HOST': 'db', 'PORT': '', 'NAME': 'app',
+            'POOL': {'MAX_SIZE': 2, 'TIMEOUT': 1},
+        })
+
+    def test_connections_are_shared_through_the_pool(self):
+        first, second = self.pooled_wrapper(), self.pooled_wrapper()
+
+        first.ensure_connection()
+        connection = first.connection
+        first.close()
+        second.ensure_connection()
+
+        self.assertIs(second.connection, connection)
+        self.assertFalse(connection.close.called)
+        self.assertEqual(first.connects + second.connects, 1)
+
+    def test_connection_closed_in_atomic_block_is_discarded(self):
+        wrapper = self.pooled_wrapper()
+        wrapper.ensure_connection()
+        connection = wrapper.connection
+        wrapper.in_atomic_block = True
+
+        wrapper.close()
+
+        self.assertTrue(connection.close.called)
+        self.assertEqual(wrapper.pool.stats()['size'], 0)
+
+    def test_without_pool_settings_connections_are_opened(self):
+        wrapper = PooledWrapper(settings_dict={'HOST': 'db', 'PORT': '', 'NAME': 'app'})
+        wrapper.ensure_connection()
+        connection = wrapper.connection
+        wrapper.close()
+
+        self.assertTrue(connection.close.called)
+
+    def test_default_validation_runs_a_query(self):
+        wrapper = DefaultValidationWrapper()
+        alive, dead = Mock(), Mock()
+        dead.cursor.return_value.execute.side_effect = sqlite3.OperationalError('gone')
+
+        self.assertTrue(wrapper.validate_pooled_connection(alive))
+        alive.cursor.return_value.execute.assert_called_once_with('SELECT 1')
+        self.assertFalse(wrapper.validate_pooled_connection(dead))
+        self.assertTrue(dead.cursor.return_value.close.called)
@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from core.db import health
+
+
+class HealthEndpointTests(TestCase):
+
+    def test_healthz(self):
+        response = self.client.get(reverse('healthz'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_readyz_ready(self):
+        response = self.client.get(reverse('readyz'))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'ready')
+        self.assertTrue(body['database']['ok'])
+        self.assertGreaterEqual(body['database']['latency_ms'], 0)
+        self.assertEqual(body['migrations']['pending'], 0)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+    @patch('core.db.health.ping', side_effect=OperationalError)
+    def test_readyz_database_down(self, ping):
+        response = self.client.get(reverse('readyz'))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['database'], {'ok': False, 'error': 'OperationalError'})
+
+    @patch('core.db.health.pending_migrations', return_value=['core.0099_next'])
+    def test_readyz_pending_migrations(self, pending):
+        response = self.client.get(reverse('readyz'))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['migrations'], {'pending': 1, 'names': ['core.0099_next']})
+
+    def test_pending_migrations_remembered_once_applied(self):
+        with patch.object(health, '_migrated', set()):
+            self.assertEqual(health.pending_migrations(), [])
+            with patch('core.db.health.MigrationExecutor') as executor:
+                self.assertEqual(health.pending_migrations(), [])
+            self.assertFalse(executor.called)
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+
+CONTENT = bytes(range(256)) * 4
+
+
+def media_url(path):
+    return reverse('media', args=[path])
+
+
+class ServeMediaTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            MEDIA_ACCEL_BACKEND=''
+        )
+        self.settings_override.enable()
+
+        os.makedirs(os.path.join(self.media_root, 'uploads'))
+        self.path = os.path.join(self.media_root, 'uploads', 'photo.jpg')
+        with open(self.path, 'wb') as f:
+            f.write(CONTENT)
+        self.last_modified = http_date(os.stat(self.path).st_mtime)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_serve_whole_file(self):
+        response = self.client.get(media_url('uploads/photo.jpg'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Last-Modified'], self.last_modified)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_content_addressed_media_is_immutable(self):
+        os.makedirs(os.path.join(self.media_root, 'uploads', 'recipe', 'ab'))
+        with open(os.path.join(self.media_root, 'uploads', 'recipe', 'ab', 'abc.jpg'), 'wb') as f:
+            f.write(CONTENT)
+
+        response = self.client.get(media_url('uploads/recipe/ab/abc.jpg'))
+
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+        response = self.client.get(media_url('uploads/photo.jpg'))
+        self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_serve_byte_range(self):
+        response = self.client.get(media_url('uploads/photo.jpg'), HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+
+    def test_serve_open_and_suffix_ranges(self):
+        response = self.client.get(media_url('uploads/photo.jpg'), HTTP_RANGE='bytes=1000-')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[1000:])
+
+        response = self.client.get(media_url('uploads/photo.jpg'), HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-5:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(media_url('uploads/photo.jpg'), HTTP_RANGE='bytes=5000-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range_serves_whole_file(self):
+        response = self.client.get(
+            media_url('uploads/photo.jpg'),
+            HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='Thu, 01 Jan 1970 00:00:00 GMT'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    def test_not_modified_since(self):
+        response = self.client.get(
+            media_url('uploads/photo.jpg'),
+            HTTP_IF_MODIFIED_SINCE=self.last_modified
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_file_and_traversal(self):
+        self.assertEqual(self.client.get(media_url('uploads/missing.jpg')).status_code, 404)
+        self.assertEqual(self.client.get(media_url('uploads')).status_code, 404)
+        self.assertEqual(self.client.get(media_url('../etc/passwd')).status_code, 404)
+
+    def test_post_not_allowed(self):
+        response = self.client.post(media_url('uploads/photo.jpg'))
+
+        self.assertEqual(response.status_code, 405)
+
+    @override_settings(
+        MEDIA_ACCEL_BACKEND='x-accel-redirect',
+        MEDIA_ACCEL_REDIRECT_URL='/protected-media/'
+    )
+    def test_x_accel_redirect(self):
+        response = self.client.get(media_url('uploads/photo.jpg'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/uploads/photo.jpg')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_ACCEL_BACKEND='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(media_url('uploads/photo.jpg'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Sendfile'], self.path)
@@ -0,0 +1,116 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics
+
+
+def sample_value(name, **labels):
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_request_recorded_per_view(self):
+        labels = {'view': 'RecipeListCreateAPIView', 'method': 'GET'}
+        before = {
+            'requests': sample_value('api_request_duration_seconds_count', status='200', **labels),
+            'queries': sample_value('api_request_db_queries_sum', **labels),
+            'serializes': sample_value('api_response_serialize_seconds_count', **labels),
+            'renders': sample_value('api_response_render_seconds_count', **labels),
+            'bytes': sample_value('api_response_size_bytes_sum', **labels),
+        }
+
+        response = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(
+            sample_value('api_request_duration_seconds_count', status='200', **labels),
+            before['requests'] + 1
+        )
+        self.assertGreater(sample_value('api_request_db_queries_sum', **labels), before['queries'])
+        self.assertEqual(
+            sample_value('api_response_serialize_seconds_count', **labels),
+            before['serializes'] + 1
+        )
+        self.assertEqual(sample_value('api_response_render_seconds_count', **labels), before['renders'] + 1)
+        self.assertEqual(
+            sample_value('api_response_size_bytes_sum', **labels),
+            before['bytes'] + len(response.content)
+        )
+
+    def test_unresolved_requests_share_one_label(self):
+        labels = {'view': '<unresolved>', 'method': 'GET', 'status': '404'}
+        before = sample_value('api_request_duration_seconds_count', **labels)
+
+        self.client.get('/no/such/page/')
+
+        self.assertEqual(sample_value('api_request_duration_seconds_count', **labels), before + 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('recipe:tag-list'))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            b'api_request_duration_seconds_count{method="GET",status="200",view="TagListCreateAPIView"}',
+            response.content
+        )
+
+
+class MultiProcessMetricsTests(TestCase):
+
+    def test_samples_summed_across_processes(self):
+        script = (
+            "from core import metrics; "
+            "metrics.REQUEST_LATENCY.labels('RecipeListCreateAPIView', 'GET', 200).observe(0.1)"
+        )
+        with tempfile.TemporaryDirectory() as path:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=path)
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', script], check=True, env=env)
+
+            with patch.dict('os.environ', {'PROMETHEUS_MULTIPROC_DIR': path}):
+                body, content_type = metrics.render_metrics()
+
+        self.assertIn(
+            b'api_request_duration_seconds_count{method="GET",status="200",'
+            b'view="RecipeListCreateAPIView"} 2.0',
+            body
+        )
+
+
+class PoolMetricsTests(TestCase):
+
+    def pool_stats(self, checkouts, in_use):
+        return {'test-pool': {
+            'checkouts': checkouts, 'waits': 0, 'wait_time_seconds': 0.0,
+            'timeouts': 0, 'in_use': in_use, 'idle': 1,
+        }}
+
+    def test_pool_totals_exported_as_deltas(self):
+        before = sample_value('db_pool_checkouts_total', alias='test-pool')
+        with patch.dict(metrics._last_pool_stats, clear=True):
+            with patch('core.metrics.pool_stats', return_value=self.pool_stats(5, 2)):
+                metrics.record_pool_stats()
+            with patch('core.metrics.pool_stats', return_value=self.pool_stats(8, 1)):
+                metrics.record_pool_stats()
+
+        self.assertEqual(sample_value('db_pool_checkouts_total', alias='test-pool'), before + 8)
+        self.assertEqual(sample_value('db_pool_connections', alias='test-pool', state='in_use'), 1)
@@ -1,5 +1,6 @@
-from unittest.mock import patch
+import hashlib
 
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from core import models
@@ -67,11 +68,10 @@ class ModelTests(TestCase):
         
         self.assertEqual(str(recipe), recipe.title)
         
-    @patch('uuid.uuid4')
-    def test_recipe_file_name_uuid(self, mock_uuid):
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
-        file_path = models.recipe_image_file_path(None, 'myimage.jpg')
+    def test_recipe_file_name_content_hash(self):
+        recipe = models.Recipe(image=SimpleUploadedFile('myimage.JPG', b'image content'))
+        file_path = models.recipe_image_file_path(recipe, 'myimage.JPG')
         
-        exp_path = f'uploads/recipe/{uuid}.jpg'
+        digest = hashlib.sha256(b'image content').hexdigest()
+        exp_path = f'uploads/recipe/{digest[:2]}/{digest}.jpg'
         self.assertEqual(file_path, exp_path)
\ No newline at end of file
@@ -0,0 +1,166 @@
+import datetime
+import io
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+import pytz
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+
+class Price(float):
+    pass
+
+
+def envelope(data):
+    return OrderedDict([
+        ('status', 200),
+        ('message', _('Records retrieved successfully')),
+        ('data', data),
+    ])
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """ The orjson renderer writes exactly the bytes DRF's renderer does """
+
+    def assertSameBytes(self, data, accepted_media_type=None, renderer_context=None):
+        expected = JSONRenderer().render(data, accepted_media_type, renderer_context)
+        rendered = ORJSONRenderer().render(data, accepted_media_type, renderer_context)
+        self.assertEqual(rendered, expected)
+
+    def test_envelope_with_model_values(self):
+        self.assertSameBytes(envelope([OrderedDict([
+            ('id', 1),
+            ('title', 'Ugali na sukuma'),
+            ('price', Decimal('5.00')),
+            ('cheap', Decimal('0.10')),
+            ('created', timezone.now()),
+            ('naive', datetime.datetime(2019, 1, 2, 3, 4, 5, 678901)),
+            ('offset', datetime.datetime(
+                2019, 1, 2, tzinfo=datetime.timezone(datetime.timedelta(hours=3))
+            )),
+            ('london', pytz.timezone('Europe/London').localize(
+                datetime.datetime(2019, 1, 2, 3, 4, 5)
+            )),
+            ('day', datetime.date(2019, 1, 2)),
+            ('at', datetime.time(7, 30)),
+            ('cooking', datetime.timedelta(minutes=90)),
+            ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+            ('tags', (1, 2, 3)),
+            ('image', None),
+            ('published', True),
+        ])]))
+
+    def test_strings(self):
+        self.assertSameBytes({
+            'unicode': 'Crème brûlée, 寿司, 🍕',
+            'escapes': 'quote " backslash \\ slash / \n\t\r\b\f \x00 \x1f \x7f',
+            'separators': 'line\u2028paragraph\u2029',
+            'lazy': _('Record created successfully'),
+        })
+
+    def test_numbers(self):
+        self.assertSameBytes([
+            0, -1, 2 ** 63 - 1, -2 ** 63, 2 ** 64, -2 ** 70,
+            0.0, -0.0, 0.1, 1.5, 123456.789, 1e15, 1e16, 1.2345e22,
+            1e-4, 1e-5, 9.9e-5, 1e-7, 5e-324, Price(1.25),
+        ])
+
+    def test_indented(self):
+        data = envelope({'price': Decimal('5.00'), 'tags': [1, 2]})
+        self.assertSameBytes(data, 'application/json; indent=4')
+        self.assertSameBytes(data, renderer_context={'indent': 2})
+
+    def test_none(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_unserializable_raises_like_drf(self):
+        with self.assertRaises(TypeError):
+            JSONRenderer().render({'bad': object()})
+        with self.assertRaises(TypeError):
+            ORJSONRenderer().render({'bad': object()})
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """ The orjson parser returns exactly the data DRF's parser does """
+
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), 'application/json', {'encoding': 'utf-8'})
+
+    def assertSameData(self, body):
+        expected = self.parse(JSONParser(), body)
+        parsed = self.parse(ORJSONParser(), body)
+        self.assertEqual(parsed, expected)
+        self.assertEqual(repr(parsed), repr(expected))
+
+    def test_same_data(self):
+        self.assertSameData(
+            '{"title": "Crème brûlée", "time_minutes": 5, "price": "5.00",'
+            ' "tags": [1, 2], "extra": null, "flag": true, "ratio": 0.1}'.encode('utf-8')
+        )
+        self.assertSameData(b'[{"name": "a"}, {"name": "b"}]')
+        self.assertSameData(b'{"a": 1, "a": 2}')
+
+    def test_long_integers_stay_exact(self):
+        self.assertSameData(b'[18446744073709551616, -9223372036854775809]')
+
+    def test_stdlib_only_values(self):
+        self.assertSameData(b'["\\ud800", 1e400]')
+
+    def test_errors_match_drf(self):
+        for body in (b'', b'{"a": ', b'NaN', b'[Infinity]', b'\xff', b'\xef\xbb\xbf{}'):
+            with self.assertRaises(ParseError) as expected:
+                self.parse(JSONParser(), body)
+            with self.assertRaises(ParseError) as raised:
+                self.parse(ORJSONParser(), body)
+            self.assertEqual(str(raised.exception), str(expected.exception))
+
+
+class ORJSONSettingsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@gmail.com', 'testpass123')
+        self.client.force_authenticate(self.user)
+
+    def test_api_renders_and_parses_with_orjson(self):
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        response = self.client.post(reverse('recipe:recipe-list'), {
+            'title': 'Pilau',
+            'time_minutes': 45,
+            'price': '7.50',
+            'tags': [tag.id],
+            'ingredients': [ingredient.id],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+        self.assertIsInstance(response.renderer_context['request'].parsers[0], ORJSONParser)
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(response.data)
+        )
+        self.assertTrue(Recipe.objects.filter(title='Pilau').exists())
+
+    def test_token_views_parse_json_and_forms(self):
+        get_user_model().objects.create_user('token@gmail.com', 'testpass123')
+        url = reverse('user:token')
+        credentials = {'email': 'token@gmail.com', 'password': 'testpass123'}
+
+        self.assertEqual(self.client.post(url, credentials, format='json').status_code, 200)
+        self.assertEqual(self.client.post(url, credentials).status_code, 200)
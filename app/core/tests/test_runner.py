@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from core.runner import LocalCacheTestRunner
+
+
+MEMCACHED = {
+    'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+    'LOCATION': 'cache:11211',
+}
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+class LocalCacheTestRunnerTests(SimpleTestCase):
+    
+    @override_settings(CACHES={'default': MEMCACHED, 'auth': MEMCACHED})
+    def test_shared_caches_replaced_while_testing(self):
+        runner = LocalCacheTestRunner(verbosity=0)
+        with patch('django.test.runner.setup_test_environment'), \
+                patch('django.test.runner.teardown_test_environment'):
+            runner.setup_test_environment()
+            backends = {alias: config['BACKEND'] for alias, config in settings.CACHES.items()}
+            runner.teardown_test_environment()
+            
+        self.assertEqual(backends, {'default': LOCMEM, 'auth': LOCMEM})
+        self.assertEqual(settings.CACHES['auth'], MEMCACHED)
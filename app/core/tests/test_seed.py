@@ -0,0 +1,96 @@
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import authenticate
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from core import seed
+from core.models import User, Tag, Ingredient, Recipe
+from core.search import search_recipes
+
+
+class SeedTests(TestCase):
+    
+    def test_seed_creates_the_dataset(self):
+        users = seed.seed(2, 5, 4, 6, links=3)
+        
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Recipe.objects.filter(user=users[1]).count(), 5)
+        self.assertEqual(Tag.objects.filter(user=users[0]).count(), 4)
+        self.assertEqual(Ingredient.objects.filter(user=users[0]).count(), 6)
+        for recipe in Recipe.objects.filter(user=users[1]):
+            self.assertEqual(recipe.tags.filter(user=users[1]).count(), 3)
+            self.assertEqual(recipe.ingredients.filter(user=users[1]).count(), 3)
+            
+    def test_seeded_users_can_log_in(self):
+        user = seed.seed(1, 1, 1, 1)[0]
+        
+        self.assertEqual(authenticate(email=user.email, password=seed.SEED_PASSWORD), user)
+        
+    def test_seed_is_deterministic_and_extends(self):
+        first = seed.seed(1, 4, 2, 2, seed=7)[0]
+        second = seed.seed(1, 4, 2, 2, seed=7)[0]
+        
+        titles = [
+            list(Recipe.objects.filter(user=user).order_by('pk').values_list('title', flat=True))
+            for user in (first, second)
+        ]
+        self.assertEqual(titles[0], titles[1])
+        self.assertNotEqual(first.email, second.email)
+        
+        # The sequences were moved past the explicit ids
+        self.assertGreater(Recipe.objects.create(user=first, title='new', time_minutes=1, price=1).pk, 8)
+        
+    def test_seeded_recipes_are_searchable(self):
+        user = seed.seed(1, 3, 1, 1)[0]
+        recipe = Recipe.objects.filter(user=user).first()
+        
+        found = search_recipes(Recipe.objects.filter(user=user), recipe.title)
+        
+        self.assertIn(recipe, found)
+        
+    def test_rows_are_written_in_batches(self):
+        writer = seed.BulkCreateWriter(batch_size=10)
+        
+        with patch.object(writer, 'insert', wraps=writer.insert) as insert:
+            seed.seed(2, 20, 3, 3, links=2, writer=writer)
+            
+        self.assertTrue(all(len(call[0][1]) <= 10 for call in insert.call_args_list))
+        self.assertEqual(writer.counts[Recipe], 40)
+        self.assertEqual(writer.counts[seed.RecipeTag], 80)
+        self.assertEqual(Recipe.tags.through.objects.count(), 80)
+        
+    def test_copy_writer(self):
+        user = seed.seed(1, 1, 1, 1)[0]
+        recipe = Recipe(id=42, user_id=user.pk, title='Pilau, "spicy"', time_minutes=5, price=1.5)
+        cursor = MagicMock()
+        
+        with patch.object(connection, 'cursor') as get_cursor:
+            get_cursor.return_value.__enter__.return_value = cursor
+            seed.CopyWriter().write(Recipe, [recipe])
+            
+        sql, buffer = cursor.copy_expert.call_args[0]
+        self.assertTrue(sql.startswith('COPY "core_recipe" ("id", "user_id", "title"'))
+        self.assertIn("FORMAT csv, NULL '\\N'", sql)
+        self.assertEqual(
+            buffer.getvalue(),
+            f'42,{user.pk},"Pilau, ""spicy""",5,1.50,,,\\N,\r\n'
+        )
+        
+    def test_seed_command(self):
+        out = StringIO()
+        call_command('seed', '--users', '2', '--recipes', '3', '--method', 'bulk', stdout=out)
+        
+        self.assertEqual(Recipe.objects.count(), 6)
+        self.assertIn('core_recipe_tags', out.getvalue())
+        self.assertIn('Seeded', out.getvalue())
+        
+    def test_seed_command_copy_needs_postgres(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('COPY is available')
+            
+        with self.assertRaises(CommandError):
+            call_command('seed', '--method', 'copy', stdout=StringIO())
@@ -0,0 +1,82 @@
+import io
+import struct
+import zlib
+
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from core.uploads import (
+    InvalidImage, LimitedTemporaryFileUploadHandler, UploadTooLarge, inspect_image
+)
+
+
+def png_header(width, height):
+    """ A PNG signature and IHDR chunk announcing `width` x `height`, no pixels """
+    ihdr = b'IHDR' + struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    chunk = struct.pack('>I', 13) + ihdr + struct.pack('>I', zlib.crc32(ihdr))
+    return b'\x89PNG\r\n\x1a\n' + chunk
+
+
+def sample_image(size=(20, 10), fmt='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size).save(buffer, format=fmt)
+    return SimpleUploadedFile('sample.' + fmt.lower(), buffer.getvalue())
+
+
+class UploadHandlerTests(TestCase):
+
+    def test_file_over_limit_is_refused(self):
+        handler = LimitedTemporaryFileUploadHandler(max_size=100)
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+
+        handler.receive_data_chunk(b'x' * 60, 0)
+        with self.assertRaises(UploadTooLarge):
+            handler.receive_data_chunk(b'x' * 60, 60)
+
+    def test_file_within_limit_is_written_to_disk(self):
+        handler = LimitedTemporaryFileUploadHandler(max_size=100)
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+
+        handler.receive_data_chunk(b'x' * 100, 0)
+        uploaded = handler.file_complete(100)
+
+        with open(uploaded.temporary_file_path(), 'rb') as f:
+            self.assertEqual(f.read(), b'x' * 100)
+        uploaded.close()
+
+    def test_oversized_body_is_refused_before_reading(self):
+        handler = LimitedTemporaryFileUploadHandler(max_size=100)
+
+        with self.assertRaises(UploadTooLarge):
+            handler.handle_raw_input(None, {}, 10 * 1024 * 1024, b'boundary')
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1234)
+    def test_limit_defaults_to_setting(self):
+        self.assertEqual(LimitedTemporaryFileUploadHandler().max_size, 1234)
+
+
+class InspectImageTests(TestCase):
+
+    def test_header_of_valid_image(self):
+        self.assertEqual(inspect_image(sample_image()), ('JPEG', 20, 10))
+
+    def test_not_an_image(self):
+        with self.assertRaises(InvalidImage):
+            inspect_image(SimpleUploadedFile('photo.jpg', b'not an image'))
+
+    def test_unsupported_format(self):
+        with self.assertRaises(InvalidImage):
+            inspect_image(sample_image(fmt='BMP'))
+
+    def test_too_many_pixels(self):
+        with self.assertRaises(InvalidImage):
+            inspect_image(sample_image(size=(20, 10)), max_pixels=199)
+
+    def test_decompression_bomb_rejected_from_header(self):
+        """ Test a header announcing ten billion pixels is refused unread """
+        bomb = SimpleUploadedFile('bomb.png', png_header(100000, 100000))
+
+        with self.assertRaises(InvalidImage):
+            inspect_image(bomb)
@@ -0,0 +1,92 @@
+import re
+from collections import Counter
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.cache import RESPONSE_CACHE_ALIAS
+from user.authentication import AUTH_CACHE_ALIAS
+
+
+SCALING_SIZES = (1, 10, 100)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\?(?:, \?)*\)')
+# The rows of a multi-row INSERT: VALUES (...), (...) or SQLite's UNION ALL
+_ROWS = re.compile(r'(?:, \(\.\.\.\))+|(?: UNION ALL SELECT \?(?:, \?)*)+')
+
+
+def sql_template(sql):
+    """ `sql` with its literals replaced, so repeats of one query compare equal """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+
+    sql = _LIST.sub('(...)', sql)
+
+    return _ROWS.sub(' ...', sql)
+
+
+class QueryScalingMixin(object):
+    """
+    Guard views against queries that grow with the data, like a missing
+    prefetch or a lookup per item.
+
+        self.assertConstantQueries(RecipeListCreateAPIView, lambda n: (
+            'GET', RECIPES_URL, self.create_recipes(n)
+        ))
+    """
+    scaling_sizes = SCALING_SIZES
+
+    def assertConstantQueries(self, view_class, request, sizes=None, format='json'):
+        """
+        For each n in `sizes`, `request(n)` sets up a dataset of size n
+        and returns the (method, url, data) to send, encoded as `format`
+        unless it is a GET. The request must be
+        answered by `view_class` and run the same number of queries at
+        every n; otherwise the SQL templates that got more frequent are
+        listed in the failure.
+
+        The auth and response caches are emptied before each request, so
+        they all do the same, full, work.
+        """
+        sizes = sizes or self.scaling_sizes
+        captured = []
+        for size in sizes:
+            method, url, data = request(size)
+            caches[AUTH_CACHE_ALIAS].clear()
+            caches[RESPONSE_CACHE_ALIAS].clear()
+
+            send = getattr(self.client, method.lower())
+            with CaptureQueriesContext(connection) as queries:
+                if method == 'GET':
+                    response = send(url, data)
+                else:
+                    response = send(url, data, format=format)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+
+            self.assertLess(
+                response.status_code, 400,
+                f'{method} {url} at n={size} answered {response.status_code}'
+            )
+            self.assertIs(response.resolver_match.func.view_class, view_class)
+            captured.append(Counter(sql_template(query['sql']) for query in queries))
+
+        counts = [sum(templates.values()) for templates in captured]
+        if len(set(counts)) == 1:
+            return
+
+        first, last = captured[0], captured[-1]
+        grown = sorted(
+            (last[template] - first[template], template)
+            for template in last
+            if last[template] > first[template]
+        )
+        self.fail('\n'.join(
+            [
+                f'{view_class.__name__} {method}: queries grow with the data',
+                ', '.join(f'n={size}: {count}' for size, count in zip(sizes, counts)),
+            ] + [f'  +{growth}  {template}' for growth, template in reversed(grown)]
+        ))
@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+
+from core import cache as response_cache
+
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """ The process pool, started on first use so forked workers stay small """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS)
+
+    return _executor
+
+
+def variant_name(image_name, width, fmt):
+    root = os.path.splitext(image_name)[0]
+    return f'{root}_{width}w.{FORMAT_EXTENSIONS[fmt]}'
+
+
+def render_thumbnails(source_path, targets, quality):
+    """
+    Resize the image at `source_path` into every (width, format, path) of
+    `targets` and return the targets written. Runs in a pool worker, so
+    it only touches Pillow and the filesystem, never Django or the db.
+    Widths wider than the original are skipped rather than upscaled, and a
+    target that can't be written is logged and skipped, not the others.
+    """
+    from PIL import Image
+
+    written = []
+    with Image.open(source_path) as image:
+        source_width, source_height = image.size
+        widths = [width for width, fmt, path in targets if width < source_width]
+        if widths:
+            # Let the JPEG decoder scale down by up to 8x while decoding,
+            # so a large photo is never expanded at full resolution
+            largest = max(widths)
+            image.draft('RGB', (largest, source_height * largest // source_width))
+
+        image = image.convert('RGB')
+        for width, fmt, path in targets:
+            if width >= source_width:
+                continue
+
+            height = max(1, round(source_height * width / source_width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            try:
+                resized.save(path, format=fmt, quality=quality)
+            except (OSError, KeyError):
+                # e.g. a Pillow built without the format's encoder
+                logger.exception('Could not write the %s thumbnail %s', fmt, path)
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            written.append((width, fmt, path))
+
+    return written
+
+
+def record_thumbnails(recipe_id, user_id, image_name, targets, written):
+    """
+    Store the finished variants on the recipe, unless its image has been
+    replaced in the meantime, and invalidate the user's cached reads.
+    """
+    from core.models import Recipe
+
+    done = {(width, fmt) for width, fmt, path in written}
+    variants = [
+        {'width': width, 'format': FORMAT_EXTENSIONS[fmt], 'name': name}
+        for width, fmt, name in targets
+        if (width, fmt) in done
+    ]
+
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_variants=json.dumps(variants)
+    )
+    if updated:
+        response_cache.bump_user_version(user_id)
+
+
+def _thumbnails_done(recipe_id, user_id, image_name, targets, future):
+    # Called on the pool's management thread, which has its own connection
+    try:
+        record_thumbnails(recipe_id, user_id, image_name, targets, future.result())
+    except Exception:
+        logger.exception('Thumbnail generation failed for recipe %s', recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_thumbnails(recipe):
+    """
+    Generate the THUMBNAIL_WIDTHS x THUMBNAIL_FORMATS variants of the
+    recipe's image in the process pool and return straight away. With
+    THUMBNAIL_WORKERS = 0 they are rendered inline instead.
+    """
+    image_name = recipe.image.name
+    source_path = default_storage.path(image_name)
+    named = [
+        (width, fmt, variant_name(image_name, width, fmt))
+        for width in settings.THUMBNAIL_WIDTHS
+        for fmt in settings.THUMBNAIL_FORMATS
+    ]
+    targets = [(width, fmt, default_storage.path(name)) for width, fmt, name in named]
+    quality = settings.THUMBNAIL_QUALITY
+
+    if not settings.THUMBNAIL_WORKERS:
+        written = render_thumbnails(source_path, targets, quality)
+        record_thumbnails(recipe.pk, recipe.user_id, image_name, named, written)
+        return
+
+    future = get_executor().submit(render_thumbnails, source_path, targets, quality)
+    future.add_done_callback(
+        partial(_thumbnails_done, recipe.pk, recipe.user_id, image_name, named)
+    )
+
+
+def delete_variants(image_name):
+    """ Delete every variant of `image_name` the current settings could produce """
+    for width in settings.THUMBNAIL_WIDTHS:
+        for fmt in settings.THUMBNAIL_FORMATS:
+            default_storage.delete(variant_name(image_name, width, fmt))
@@ -0,0 +1,97 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Uploaded file is too large.')
+    default_code = 'upload_too_large'
+
+
+class InvalidImage(Exception):
+    pass
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream every uploaded file straight to a temporary file on disk, never
+    holding more than one chunk in memory, and abort the request as soon
+    as a file grows past `max_size` bytes instead of reading the rest of
+    the body. The sha256 of each file is computed on the way through.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super(LimitedTemporaryFileUploadHandler, self).__init__(request)
+        if max_size is None:
+            max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+        self.max_size = max_size
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # The body holds more than the file, but a body over the limit plus
+        # a generous allowance for the other fields cannot be accepted
+        if content_length and content_length > self.max_size + 64 * 1024:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super(LimitedTemporaryFileUploadHandler, self).new_file(*args, **kwargs)
+        self.received = 0
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.file.close()
+            raise UploadTooLarge()
+
+        self.hasher.update(raw_data)
+        return super(LimitedTemporaryFileUploadHandler, self).receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        # The content hash the file will be stored under, see core.models.ImageBlob
+        file = super(LimitedTemporaryFileUploadHandler, self).file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+def inspect_image(file, formats=None, max_pixels=None):
+    """
+    Read just the header of an uploaded image and return its
+    (format, width, height). Pillow decodes no pixel data here, so a
+    decompression bomb is refused before it can be expanded in memory.
+    Raises InvalidImage when the file is not an acceptable image.
+    """
+    from PIL import Image
+
+    if formats is None:
+        formats = settings.IMAGE_UPLOAD_FORMATS
+    if max_pixels is None:
+        max_pixels = settings.IMAGE_UPLOAD_MAX_PIXELS
+
+    file.seek(0)
+    try:
+        # Not a context manager: closing the image would close the upload
+        image = Image.open(file)
+        fmt, (width, height) = image.format, image.size
+    except Image.DecompressionBombError:
+        raise InvalidImage(_('Image dimensions are too large.'))
+    except (IOError, SyntaxError, ValueError):
+        raise InvalidImage(_(
+            'Upload a valid image. The file you uploaded was either not an '
+            'image or a corrupted image.'
+        ))
+    finally:
+        file.seek(0)
+
+    if fmt not in formats:
+        raise InvalidImage(_('Unsupported image format.'))
+
+    if width * height > max_pixels:
+        raise InvalidImage(_('Image dimensions are too large.'))
+
+    return fmt, width, height
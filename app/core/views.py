@@ -0,0 +1,220 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import DEFAULT_DB_ALIAS
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+)
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+from core import metrics
+from core.db import health
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class MediaFileResponse(FileResponse):
+    # Only used when the server has no wsgi.file_wrapper to sendfile() with
+    block_size = 64 * 1024
+
+
+class FileRange(object):
+    """
+    A read-only view of `length` bytes of `file` from `start`. It keeps
+    the `fileno()` of the underlying file and leaves it positioned at
+    `start`, so a server's wsgi.file_wrapper can still sendfile() the
+    range, bounded by the Content-Length of the response.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return the (start, end) byte offsets, inclusive, requested by a single
+    range `Range` header, None when the header should be ignored, or
+    raise ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+
+    if start > end or start >= size:
+        raise ValueError()
+
+    return start, end
+
+
+def accel_response(path, fullpath, content_type):
+    """ Hand the file to the front proxy instead of sending it from Python """
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_ACCEL_BACKEND == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_REDIRECT_URL + path)
+    else:
+        response['X-Sendfile'] = fullpath
+
+    return response
+
+
+def is_immutable(path):
+    """ Files named after their content never change once written """
+    return path.startswith(tuple(settings.MEDIA_IMMUTABLE_PREFIXES))
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file below MEDIA_ROOT.
+
+    With MEDIA_ACCEL_BACKEND set to `x-accel-redirect` (nginx) or
+    `x-sendfile` (Apache, lighttpd) the proxy sends the file itself and
+    the worker is free at once. Otherwise the file is returned in a
+    FileResponse, which WSGI servers such as gunicorn hand to
+    os.sendfile(), with support for single byte ranges and
+    If-Modified-Since. Content addressed images, below one of the
+    MEDIA_IMMUTABLE_PREFIXES, are marked cacheable forever.
+    """
+    response = _serve_media(request, path)
+    if response.status_code in (200, 206, 304) and is_immutable(path):
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+
+    return response
+
+
+def _serve_media(request, path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        statobj = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404()
+    if not stat.S_ISREG(statobj.st_mode):
+        raise Http404()
+
+    last_modified = http_date(statobj.st_mtime)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'),
+        statobj.st_mtime,
+        statobj.st_size
+    ):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    if settings.MEDIA_ACCEL_BACKEND:
+        response = accel_response(path, fullpath, content_type)
+        response['Last-Modified'] = last_modified
+        return response
+
+    size = statobj.st_size
+    requested = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is not None and if_range != last_modified:
+        requested = None
+
+    try:
+        byte_range = parse_range(requested, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = MediaFileResponse(open(fullpath, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = MediaFileResponse(
+            FileRange(open(fullpath, 'rb'), start, length),
+            status=206,
+            content_type=content_type
+        )
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Last-Modified'] = last_modified
+    response['Accept-Ranges'] = 'bytes'
+
+    return response
+
+
+@require_safe
+def healthz(request):
+    """ Liveness: the process is up and serving requests """
+    return JsonResponse({'status': 'ok'})
+
+
+@require_safe
+def readyz(request):
+    """
+    Readiness: the database answers and has every migration applied. The
+    round trip of the check is reported so slow instances stand out.
+    """
+    ready = True
+    try:
+        latency = health.ping(DEFAULT_DB_ALIAS)
+        database = {'ok': True, 'latency_ms': round(latency * 1000, 3)}
+    except Exception as exc:
+        ready = False
+        database = {'ok': False, 'error': exc.__class__.__name__}
+
+    if database['ok']:
+        pending = health.pending_migrations(DEFAULT_DB_ALIAS)
+        migrations = {'pending': len(pending), 'names': pending}
+        ready = not pending
+    else:
+        migrations = None
+
+    response = JsonResponse(
+        {
+            'status': 'ready' if ready else 'unavailable',
+            'database': database,
+            'migrations': migrations,
+        },
+        status=200 if ready else 503
+    )
+    response['Cache-Control'] = 'no-store'
+
+    return response
+
+
+def metrics_view(request):
+    """ Prometheus text exposition of the metrics of every worker """
+    body, content_type = metrics.render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
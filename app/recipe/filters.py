@@ -0,0 +1,68 @@
+from django.db.models import Count
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Recipe
+from core.search import search_recipes
+
+
+class RecipeRelationFilter(BaseFilterBackend):
+    """
+    Filter recipes by tag and ingredient ids, e.g. `?tags=1,2&ingredients=3`.
+
+    By default a recipe matches when it has any of the ids; pass
+    `?tags_match=all` (or `ingredients_match=all`) to require every id.
+    Both forms are a single semi-join on the through table: "any" is an
+    `IN (SELECT recipe_id ...)` and "all" groups the matching through rows
+    per recipe with `HAVING COUNT(DISTINCT ...) = n`, both answered from
+    the (relation_id, recipe_id) indexes.
+    """
+    relations = (
+        ('tags', 'tag_id'),
+        ('ingredients', 'ingredient_id'),
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        for param, column in self.relations:
+            value = request.query_params.get(param)
+            if not value:
+                continue
+
+            ids = self._params_to_ints(param, value)
+            match_all = request.query_params.get(f'{param}_match') == 'all'
+            through = getattr(Recipe, param).through
+            matches = through.objects.filter(**{f'{column}__in': ids})
+
+            if match_all:
+                matches = matches.values('recipe_id').annotate(
+                    matched=Count(column, distinct=True)
+                ).filter(matched=len(ids))
+
+            queryset = queryset.filter(id__in=matches.values('recipe_id'))
+
+        return queryset
+
+    def _params_to_ints(self, param, qs):
+        try:
+            return sorted({int(str_id) for str_id in qs.split(',')})
+        except ValueError:
+            raise ValidationError({
+                param: [_('Expected a comma separated list of ids.')]
+            })
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """
+    Full-text search on the recipe title with `?q=`. Results carry a
+    `rank` annotation the list view orders by, best match first.
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param)
+        if text is None:
+            return queryset
+
+        return search_recipes(queryset, text)
@@ -1,6 +1,14 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils.translation import ugettext_lazy as _
+
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, ImageBlob
+from core.uploads import InvalidImage, inspect_image
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -8,7 +16,7 @@ class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'user')
-        read_only_fields = ('id', )
+        read_only_fields = ('id', 'user')
     
     
     # def create(self, validated_data):
@@ -21,7 +29,7 @@ class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'user')
-        read_only_fields = ('id',)
+        read_only_fields = ('id', 'user')
         
     # def create(self, validated_data):
     # #     obj = Ingredient.objects.create(**validated_data)
@@ -29,12 +37,106 @@ class IngredientSerializer(serializers.ModelSerializer):
     # #     return obj
     #     raise ValueError(validated_data)
 
+class ImageVariantsField(serializers.Field):
+    """ The resized copies of a recipe image, once they have been generated """
+    model_fields = ('image_variants',)
+    
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs.setdefault('source', 'thumbnails')
+        super(ImageVariantsField, self).__init__(**kwargs)
+        
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = []
+        for variant in value:
+            url = default_storage.url(variant['name'])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            variants.append({
+                'width': variant['width'],
+                'format': variant['format'],
+                'url': url,
+            })
+            
+        return variants
+
+
+class PrimaryKeyListField(serializers.ManyRelatedField):
+    """
+    The `many=True` form of BatchedPrimaryKeyRelatedField. All the ids are
+    looked up with a single query, instead of one query per id, and the
+    first invalid one is reported with the same error as DRF's.
+    """
+    
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+            
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+        items, pks, invalid = [], [], None
+        for item in data:
+            if child.pk_field is not None:
+                item = child.pk_field.to_internal_value(item)
+            try:
+                pks.append(pk_field.to_python(item))
+            except DjangoValidationError:
+                invalid = item
+                break
+            items.append(item)
+            
+        found = queryset.in_bulk(pks)
+        for item, pk in zip(items, pks):
+            if pk not in found:
+                child.fail('does_not_exist', pk_value=item)
+        if invalid is not None:
+            child.fail('incorrect_type', data_type=type(invalid).__name__)
+            
+        return [found[pk] for pk in pks]
+    
+    
+class BatchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A relation to the requesting user's own rows: the ids of anybody
+    else's are reported as not existing.
+    """
+    
+    def get_queryset(self):
+        queryset = super(BatchedPrimaryKeyRelatedField, self).get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset.none()
+            
+        return queryset.filter(user=request.user)
+    
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+                
+        return PrimaryKeyListField(**list_kwargs)
+
+
+def prefetch_requested(queryset, lookups, fields=None):
+    """ Prefetch the `lookups` of the relations among `fields`, or all of them """
+    return queryset.prefetch_related(*[
+        lookup for lookup in lookups
+        if fields is None or lookup.prefetch_to in fields
+    ])
+
+
 class RecipeSerializer(serializers.ModelSerializer):
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = BatchedPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BatchedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -45,17 +147,174 @@ class RecipeSerializer(serializers.ModelSerializer):
                     'id', 'user',
                     'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link'
                 )
-        read_only_fields = ('id',)
+        read_only_fields = ('id', 'user')
+        
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """ Prefetch the related ids rendered by the primary key fields """
+        return prefetch_requested(queryset, [
+            Prefetch('ingredients', queryset=Ingredient.objects.only('id')),
+            Prefetch('tags', queryset=Tag.objects.only('id'))
+        ], fields)
         
 
 class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    image_variants = ImageVariantsField()
+    
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('image', 'image_variants')
+        read_only_fields = ('id', 'user', 'image')
+    
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None):
+        """ Prefetch only the columns the nested serializers render """
+        return prefetch_requested(queryset, [
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only(*IngredientSerializer.Meta.fields)
+            ),
+            Prefetch(
+                'tags',
+                queryset=Tag.objects.only(*TagSerializer.Meta.fields)
+            )
+        ], fields)
     
 
+class UploadedImageField(serializers.FileField):
+    """
+    An image upload validated from its header alone: the format and the
+    pixel dimensions are checked without decoding the image, unlike
+    DRF's ImageField which has Pillow verify the whole file.
+    """
+    
+    def to_internal_value(self, data):
+        file_object = super(UploadedImageField, self).to_internal_value(data)
+        try:
+            inspect_image(file_object)
+        except InvalidImage as exc:
+            raise serializers.ValidationError(str(exc))
+            
+        return file_object
+        
+
 class RecipeImageSerializer(serializers.ModelSerializer):
+    image = UploadedImageField()
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
\ No newline at end of file
+        fields = ('id', 'image', 'image_variants')
+        read_only_fields = ('id',)
+        
+    def update(self, instance, validated_data):
+        # Store the upload once per distinct content; the variants are
+        # scheduled by the view once the recipe points at the new file
+        blob = ImageBlob.objects.acquire(validated_data['image'])
+        previous = instance.image.name
+        
+        instance.image = blob.name
+        instance.image_variants = ''
+        instance.save()
+        
+        if previous:
+            ImageBlob.objects.release(previous)
+            
+        return instance
+
+
+def bulk_insert(model, objs, batch_size=500):
+    """
+    Insert `objs` with as few statements as the backend allows and return
+    them with their primary keys set. Backends that cannot return ids from
+    a multi-row INSERT fall back to one INSERT per row.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+    
+    for obj in objs:
+        obj.save(force_insert=True)
+        
+    return objs
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return bulk_insert(model, [model(**item) for item in validated_data])
+    
+
+class TagBulkSerializer(TagSerializer):
+    
+    class Meta(TagSerializer.Meta):
+        list_serializer_class = BulkCreateListSerializer
+        
+
+class IngredientBulkSerializer(IngredientSerializer):
+    
+    class Meta(IngredientSerializer.Meta):
+        list_serializer_class = BulkCreateListSerializer
+        
+
+class RecipeBulkListSerializer(BulkCreateListSerializer):
+    """
+    Validate every recipe's tag and ingredient ids with one query per
+    relation, then insert the recipes and all their through rows with one
+    batched INSERT per table.
+    """
+    relations = (
+        ('tags', Tag, 'tag_id'),
+        ('ingredients', Ingredient, 'ingredient_id'),
+    )
+    
+    def to_internal_value(self, data):
+        attrs = super(RecipeBulkListSerializer, self).to_internal_value(data)
+        user = self.context['request'].user
+        errors = [{} for _item in attrs]
+        
+        for field, model, _column in self.relations:
+            requested = {pk for item in attrs for pk in item.get(field, [])}
+            known = set(
+                model.objects.filter(user=user, pk__in=requested).values_list('pk', flat=True)
+            )
+            for index, item in enumerate(attrs):
+                for pk in item.get(field, []):
+                    if pk not in known:
+                        message = _('Invalid pk "{pk_value}" - object does not exist.')
+                        errors[index].setdefault(field, []).append(message.format(pk_value=pk))
+                        
+        if any(errors):
+            raise serializers.ValidationError(errors)
+            
+        return attrs
+    
+    def create(self, validated_data):
+        related = [
+            {field: item.pop(field, []) for field, _model, _column in self.relations}
+            for item in validated_data
+        ]
+        recipes = bulk_insert(Recipe, [Recipe(**item) for item in validated_data])
+        
+        for field, _model, column in self.relations:
+            through = getattr(Recipe, field).through
+            through.objects.bulk_create([
+                through(recipe_id=recipe.pk, **{column: pk})
+                for recipe, item in zip(recipes, related)
+                for pk in dict.fromkeys(item[field])
+            ], batch_size=1000)
+            
+        return recipes
+    
+    def to_representation(self, data):
+        prefetch_related_objects(data, 'tags', 'ingredients')
+        return RecipeSerializer(data, many=True, context=self.context).data
+    
+    
+class RecipeBulkSerializer(RecipeSerializer):
+    ingredients = serializers.ListField(child=serializers.IntegerField(), required=False)
+    tags = serializers.ListField(child=serializers.IntegerField(), required=False)
+    
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = RecipeBulkListSerializer
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Tag
+
+AUTOCOMPLETE_URL = reverse('recipe:autocomplete')
+
+
+class AutocompleteApiTests(TestCase):
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'pass123'
+        )
+        self.client.force_authenticate(self.user)
+        
+    def test_login_required(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(AUTOCOMPLETE_URL, {'q': 'a'})
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_suggest_ingredient_names(self):
+        avocado = Ingredient.objects.create(user=self.user, name='avocado')
+        Ingredient.objects.create(user=self.user, name='kale')
+        other = get_user_model().objects.create_user('other@gmail.com', 'pass123')
+        Ingredient.objects.create(user=other, name='avocado oil')
+        
+        response = self.client.get(AUTOCOMPLETE_URL, {'type': 'ingredients', 'q': 'avo'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'], [{'id': avocado.id, 'name': 'avocado'}])
+        self.assertIn('max-age=30', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        
+    def test_suggest_tags_limited(self):
+        for name in ('Vegan', 'Vegetarian', 'Very spicy'):
+            Tag.objects.create(user=self.user, name=name)
+            
+        response = self.client.get(AUTOCOMPLETE_URL, {'type': 'tags', 'q': 'Ve', 'limit': 2})
+        
+        self.assertEqual([tag['name'] for tag in response.data['data']], ['Vegan', 'Vegetarian'])
+        
+    def test_invalid_type(self):
+        response = self.client.get(AUTOCOMPLETE_URL, {'type': 'recipes', 'q': 'a'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -41,7 +41,7 @@ class PrivateIngredintsApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['data'], serializer.data)
         
     def test_ingredients_limited_to_user(self):
         user2 = get_user_model().objects.create_user(
@@ -54,8 +54,8 @@ class PrivateIngredintsApiTests(TestCase):
         response = self.client.get(INGREDIENTS_URL)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], ingredient.name)
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertEqual(response.data['data'][0]['name'], ingredient.name)
         
     def test_create_ingredient_success(self):
         payload = {'name': 'sukuma'}
@@ -94,8 +94,8 @@ class PrivateIngredintsApiTests(TestCase):
         
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
-        self.assertIn(serializer1.data, response.data)
-        self.assertNotIn(serializer2.data, response.data)
+        self.assertIn(serializer1.data, response.data['data'])
+        self.assertNotIn(serializer2.data, response.data['data'])
         
     def test_retrieve_ingredients_assigned_unique(self):
         ingredient = Ingredient.objects.create(user=self.user, name='Eggs')
@@ -117,4 +117,4 @@ class PrivateIngredintsApiTests(TestCase):
         
         response = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
         
-        self.assertEqual(len(response.data), 1)
\ No newline at end of file
+        self.assertEqual(len(response.data['data']), 1)
\ No newline at end of file
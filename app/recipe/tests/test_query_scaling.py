@@ -0,0 +1,172 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import seed
+from core.models import ImageBlob, Recipe
+from core.tests.utils import QueryScalingMixin
+from recipe import views
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+bulk_insert_returns_ids = connection.features.can_return_ids_from_bulk_insert
+
+
+class RecipeQueryScalingTests(QueryScalingMixin, TestCase):
+    """ Every recipe, tag and ingredient endpoint at 1, 10 and 100 rows """
+    
+    def setUp(self):
+        self.client = APIClient()
+        
+    def seeded_user(self, recipes=0, tags=3, ingredients=3, links=3):
+        user = seed.seed(1, recipes, tags, ingredients, links=links)[0]
+        self.client.force_authenticate(user)
+        
+        return user
+    
+    def attribute_scaling(self, name, list_view, bulk_view, detail_view):
+        list_url = reverse(f'recipe:{name}-list')
+        bulk_url = reverse(f'recipe:{name}-bulk')
+        related = f'{name}s'
+        
+        def detail(method, data=None):
+            # One tag or ingredient shared by n recipes
+            def request(n):
+                user = self.seeded_user(recipes=n, tags=1, ingredients=1, links=1)
+                obj = getattr(user, f'{name}_set').get()
+                return method, reverse(f'recipe:{name}-detail', args=[obj.pk]), data
+            return request
+        
+        self.assertConstantQueries(list_view, lambda n: (
+            'GET', list_url, self.seeded_user(**{related: n}) and None
+        ))
+        self.assertConstantQueries(list_view, lambda n: (
+            'GET', list_url + '?assigned_only=1', self.seeded_user(n, n, n) and None
+        ))
+        self.assertConstantQueries(list_view, lambda n: (
+            'POST', list_url, self.seeded_user(**{related: n}) and {'name': 'new'}
+        ))
+        if bulk_insert_returns_ids:
+            self.assertConstantQueries(bulk_view, lambda n: (
+                'POST', bulk_url, self.seeded_user() and [{'name': f'new {i}'} for i in range(n)]
+            ))
+        self.assertConstantQueries(detail_view, detail('GET'))
+        self.assertConstantQueries(detail_view, detail('PATCH', {'name': 'renamed'}))
+        self.assertConstantQueries(detail_view, detail('DELETE'))
+        
+    def test_tag_endpoints(self):
+        self.attribute_scaling(
+            'tag',
+            views.TagListCreateAPIView,
+            views.TagBulkCreateAPIView,
+            views.TagRetrieveUpdateDestroyAPIView
+        )
+        
+    def test_ingredient_endpoints(self):
+        self.attribute_scaling(
+            'ingredient',
+            views.IngredientListCreateAPIView,
+            views.IngredientBulkCreateAPIView,
+            views.IngredientRetrieveUpdateDestroyAPIView
+        )
+        
+    def test_recipe_list(self):
+        for query in ('', '?stream=1', '?fields=id,title,tags', '?fields=title&stream=1'):
+            self.assertConstantQueries(views.RecipeListCreateAPIView, lambda n: (
+                'GET', RECIPES_URL + query, self.seeded_user(recipes=n) and None
+            ))
+            
+    def test_recipe_search(self):
+        def request(n):
+            user = self.seeded_user(recipes=n)
+            return 'GET', RECIPES_URL, {'q': user.recipe_set.first().title}
+        
+        self.assertConstantQueries(views.RecipeListCreateAPIView, request)
+        
+    def test_recipe_list_filtered(self):
+        def request(n):
+            user = self.seeded_user(recipes=n, tags=1, ingredients=1, links=1)
+            return 'GET', RECIPES_URL, {'tags': user.tag_set.get().pk}
+        
+        self.assertConstantQueries(views.RecipeListCreateAPIView, request)
+        
+    def test_recipe_create(self):
+        def request(n):
+            user = self.seeded_user(tags=n, ingredients=n)
+            return 'POST', RECIPES_URL, {
+                'title': 'new', 'time_minutes': 5, 'price': '5.00',
+                'tags': [tag.pk for tag in user.tag_set.all()],
+                'ingredients': [ingredient.pk for ingredient in user.ingredient_set.all()],
+            }
+        
+        self.assertConstantQueries(views.RecipeListCreateAPIView, request)
+        
+    def test_recipe_bulk_create(self):
+        if not bulk_insert_returns_ids:
+            self.skipTest('the backend inserts bulk rows one at a time')
+            
+        def request(n):
+            user = self.seeded_user(tags=3, ingredients=3)
+            recipe = {
+                'title': 'new', 'time_minutes': 5, 'price': '5.00',
+                'tags': [tag.pk for tag in user.tag_set.all()],
+                'ingredients': [ingredient.pk for ingredient in user.ingredient_set.all()],
+            }
+            return 'POST', reverse('recipe:recipe-bulk'), [recipe] * n
+        
+        self.assertConstantQueries(views.RecipeBulkCreateAPIView, request)
+        
+    def test_recipe_detail(self):
+        def detail(method, data=None, with_tags=False):
+            # One recipe with n tags and n ingredients
+            def request(n):
+                user = self.seeded_user(recipes=1, tags=n, ingredients=n, links=n)
+                payload = data
+                if with_tags:
+                    payload = dict(data, tags=[tag.pk for tag in user.tag_set.all()])
+                url = reverse('recipe:recipe-detail', args=[user.recipe_set.get().pk])
+                return method, url, payload
+            return request
+        
+        view = views.RecipeRetrieveUpdateDestroyAPIView
+        self.assertConstantQueries(view, detail('GET'))
+        self.assertConstantQueries(view, detail('PATCH', {'title': 'renamed'}))
+        self.assertConstantQueries(view, detail('PATCH', {'title': 'renamed'}, with_tags=True))
+        self.assertConstantQueries(view, detail('DELETE'))
+        
+    def test_recipe_upload_image(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, format='JPEG')
+        
+        def request(n):
+            user = self.seeded_user(recipes=1, tags=n, ingredients=n, links=n)
+            url = reverse('recipe:recipe-upload-image', args=[user.recipe_set.get().pk])
+            # A distinct image per size, so each stores a new blob
+            image = SimpleUploadedFile(f'{n}.jpg', buffer.getvalue() + bytes(n), 'image/jpeg')
+            return 'POST', url, {'image': image}
+        
+        with override_settings(MEDIA_ROOT=media_root, THUMBNAIL_WORKERS=0):
+            self.assertConstantQueries(
+                views.RecipeUploadImageAPIView, request, format='multipart'
+            )
+            for recipe in Recipe.objects.exclude(image=''):
+                ImageBlob.objects.release(recipe.image.name)
+                
+    def test_autocomplete(self):
+        self.assertConstantQueries(views.AutocompleteAPIView, lambda n: (
+            'GET', reverse('recipe:autocomplete'),
+            self.seeded_user(ingredients=n) and {'type': 'ingredients', 'q': 'sal'}
+        ))
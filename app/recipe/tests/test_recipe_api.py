@@ -1,19 +1,29 @@
+import base64
+import hashlib
+import json
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient 
+from core.models import Recipe, Tag, Ingredient, ImageBlob
+from core import thumbnails
+from core.pagination import KeysetPagination
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.views import RecipeListCreateAPIView
 
 RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
 
 def image_upload_url(recipe_id):
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
@@ -68,7 +78,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['data'], serializer.data)
         
     def test_recicipes_limited_to_user(self):
         user2 = get_user_model().objects.create_user(
@@ -83,8 +93,8 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertEqual(response.data['data'], serializer.data)
         
     def test_view_recipe_detail(self):
         recipe = sample_recipe(user=self.user)
@@ -95,7 +105,7 @@ class PrivateRecipeApiTests(TestCase):
         response = self.client.get(url)
         
         serializer = RecipeDetailSerializer(recipe)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['data'], serializer.data)
         
     def test_create_basic_recipe(self):
         payload = {
@@ -106,7 +116,7 @@ class PrivateRecipeApiTests(TestCase):
         response = self.client.post(RECIPES_URL, payload)
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        recipe = Recipe.objects.get(id=response.data['id'])
+        recipe = Recipe.objects.get(id=response.data['data']['id'])
         for key in payload.keys():
             self.assertEqual(payload[key], getattr(recipe, key))
             
@@ -122,7 +132,7 @@ class PrivateRecipeApiTests(TestCase):
         response = self.client.post(RECIPES_URL, payload)
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        recipe = Recipe.objects.get(id=response.data['id'])
+        recipe = Recipe.objects.get(id=response.data['data']['id'])
         tags = recipe.tags.all()
         self.assertEqual(tags.count(), 2)
         self.assertIn(tag1, tags)
@@ -140,12 +150,53 @@ class PrivateRecipeApiTests(TestCase):
         response = self.client.post(RECIPES_URL, payload)
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        recipe = Recipe.objects.get(id=response.data['id'])
+        recipe = Recipe.objects.get(id=response.data['data']['id'])
         ingredients = recipe.ingredients.all()
         self.assertEqual(ingredients.count(), 2)
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
         
+    def test_create_recipe_invalid_tag_ids(self):
+        """ Test the first bad id is reported like DRF's PrimaryKeyRelatedField does """
+        tag = sample_tag(user=self.user)
+        payload = {'title': 'cake', 'time_minutes': 30, 'price': 5.00, 'ingredients': []}
+        
+        for tags, error in (
+            ([tag.id, 9999, 'abc'], 'Invalid pk "9999" - object does not exist.'),
+            ([tag.id, 'abc', 9999], 'Incorrect type. Expected pk value, received str.'),
+            (tag.id, 'Expected a list of items but got type "int".'),
+        ):
+            response = self.client.post(RECIPES_URL, dict(payload, tags=tags), format='json')
+            
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data['tags'], [error])
+        
+    def test_create_recipe_with_other_users_relations(self):
+        other_user = get_user_model().objects.create_user('other@gmail.com', 'testpass123')
+        tag = sample_tag(user=other_user, name='theirs')
+        ingredient = sample_ingredient(user=other_user, name='theirs')
+        own_tag = sample_tag(user=self.user)
+        own_ingredient = sample_ingredient(user=self.user)
+        
+        for payload in ({'tags': [tag.id], 'ingredients': [own_ingredient.id]},
+                        {'tags': [own_tag.id], 'ingredients': [ingredient.id]}):
+            payload.update({'title': 'Stolen stew', 'time_minutes': 10, 'price': 5.00})
+            response = self.client.post(RECIPES_URL, payload)
+            
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+        
+    def test_update_recipe_with_other_users_tag(self):
+        other_user = get_user_model().objects.create_user('other@gmail.com', 'testpass123')
+        tag = sample_tag(user=other_user, name='theirs')
+        recipe = sample_recipe(user=self.user)
+        
+        response = self.client.patch(detail_url(recipe.id), {'tags': [tag.id]})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', response.data)
+        self.assertFalse(recipe.tags.exists())
+        
     def test_partial_update_recipe(self):
         recipe = sample_recipe(user=self.user)
         recipe.tags.add(sample_tag(user=self.user))
@@ -180,6 +231,311 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(tags), 0)
         
 
+    def test_retrieve_recipes_queries_run_once(self):
+        for i in range(5):
+            recipe = sample_recipe(user=self.user)
+            recipe.tags.add(sample_tag(user=self.user, name=f'tag {i}'))
+            recipe.ingredients.add(sample_ingredient(user=self.user, name=f'ingredient {i}'))
+        
+        # one query for the recipes, one each for all their tags and ingredients
+        with self.assertNumQueries(3):
+            response = self.client.get(RECIPES_URL)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 5)
+        
+    def test_retrieve_recipes_prefetches_only_ids(self):
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL)
+        
+        tags_sql = [q['sql'] for q in queries.captured_queries if 'core_tag' in q['sql']]
+        self.assertEqual(len(tags_sql), 1)
+        self.assertNotIn('"core_tag"."name"', tags_sql[0])
+        
+    def test_view_recipe_detail_queries_run_once(self):
+        recipe = sample_recipe(user=self.user)
+        
+        with self.assertNumQueries(3):
+            response = self.client.get(detail_url(recipe.id))
+            
+        self.assertEqual(response.data['data']['id'], recipe.id)
+        
+    def test_partial_update_recipe_returns_updated_data(self):
+        recipe = sample_recipe(user=self.user)
+        
+        response = self.client.patch(detail_url(recipe.id), {'title': 'new title'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['message'], 'Recipe updated successfully')
+        self.assertEqual(response.data['data']['title'], 'new title')
+        
+
+
+    def test_recipes_paginated_with_cursor(self):
+        recipes = [sample_recipe(user=self.user, title=f'recipe {i}') for i in range(5)]
+        
+        response = self.client.get(RECIPES_URL, {'page_size': 2})
+        
+        self.assertEqual([r['id'] for r in response.data['data']], [recipes[4].id, recipes[3].id])
+        self.assertIsNone(response.data['previous'])
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(response.data['next'])
+            
+        self.assertEqual([r['id'] for r in response.data['data']], [recipes[2].id, recipes[1].id])
+        self.assertNotIn('OFFSET', queries.captured_queries[0]['sql'])
+        
+        last = self.client.get(response.data['next'])
+        self.assertEqual([r['id'] for r in last.data['data']], [recipes[0].id])
+        self.assertIsNone(last.data['next'])
+        
+        previous = self.client.get(last.data['previous'])
+        self.assertEqual(previous.data['data'], response.data['data'])
+        
+    def test_recipes_page_size_capped(self):
+        sample_recipe(user=self.user)
+        sample_recipe(user=self.user)
+        
+        with patch.object(KeysetPagination, 'max_page_size', 1):
+            response = self.client.get(RECIPES_URL, {'page_size': 5000})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 1)
+        
+    def test_recipes_invalid_cursor(self):
+        response = self.client.get(RECIPES_URL, {'cursor': 'not-a-cursor'})
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+    def test_recipes_hand_edited_cursor(self):
+        sample_recipe(user=self.user)
+        cursors = [
+            ({}, ['abc']),
+            ({}, [{'a': 1}]),
+            ({}, [[1]]),
+            ({}, [None]),
+            ({'q': 'steak'}, ['abc', 1]),
+            ({'q': 'steak'}, [1, [1]]),
+            ({'q': 'steak'}, [None, 1]),
+        ]
+        for params, values in cursors:
+            cursor = base64.urlsafe_b64encode(json.dumps({'v': values}).encode('utf-8'))
+            params['cursor'] = cursor.decode('ascii')
+            response = self.client.get(RECIPES_URL, params)
+            
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, values)
+
+
+    def test_stream_recipes(self):
+        for i in range(5):
+            recipe = sample_recipe(user=self.user, title=f'recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'tag {i}'))
+        
+        with patch.object(RecipeListCreateAPIView, 'stream_chunk_size', 2):
+            response = self.client.get(RECIPES_URL, {'stream': 1})
+            content = b''.join(response.streaming_content)
+            
+        payload = json.loads(content.decode('utf-8'))
+        recipes = Recipe.objects.all().order_by('-id')
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(payload['status'], status.HTTP_200_OK)
+        self.assertEqual(payload['data'], json.loads(json.dumps(serializer.data)))
+        
+    def test_stream_recipes_empty(self):
+        response = self.client.get(RECIPES_URL, {'stream': 'true'})
+        
+        payload = json.loads(b''.join(response.streaming_content).decode('utf-8'))
+        self.assertEqual(payload['data'], [])
+
+
+    def test_view_other_users_recipe_not_found(self):
+        user2 = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'password123'
+        )
+        recipe = sample_recipe(user=user2)
+        
+        response = self.client.get(detail_url(recipe.id))
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+    def test_create_recipe_assigned_to_request_user(self):
+        user2 = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'password123'
+        )
+        payload = {
+            'title': 'pilau',
+            'time_minutes': 45,
+            'price': 15.00,
+            'user': user2.id
+        }
+        response = self.client.post(RECIPES_URL, payload)
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=response.data['data']['id'])
+        self.assertEqual(recipe.user, self.user)
+
+
+    def test_repeated_reads_served_from_cache(self):
+        recipe = sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+        self.client.get(detail_url(recipe.id))
+        
+        with self.assertNumQueries(0):
+            list_response = self.client.get(RECIPES_URL)
+            detail_response = self.client.get(detail_url(recipe.id))
+            
+        self.assertEqual(len(list_response.data['data']), 1)
+        self.assertEqual(detail_response.data['data']['id'], recipe.id)
+        
+    @override_settings(ALLOWED_HOSTS=['testserver', 'api.example.com'])
+    def test_cached_pages_keep_their_host(self):
+        sample_recipe(user=self.user)
+        sample_recipe(user=self.user)
+        self.client.get(RECIPES_URL, {'page_size': 1})
+        
+        response = self.client.get(
+            RECIPES_URL, {'page_size': 1}, HTTP_HOST='api.example.com'
+        )
+        
+        self.assertTrue(response.data['next'].startswith('http://api.example.com/'))
+        
+    def test_cached_reads_invalidated_by_writes(self):
+        recipe = sample_recipe(user=self.user)
+        self.client.get(detail_url(recipe.id))
+        
+        tag = sample_tag(user=self.user)
+        recipe.tags.add(tag)
+        response = self.client.get(detail_url(recipe.id))
+        
+        self.assertEqual(response.data['data']['tags'][0]['id'], tag.id)
+        
+        self.client.patch(detail_url(recipe.id), {'title': 'new title'})
+        response = self.client.get(RECIPES_URL)
+        
+        self.assertEqual(response.data['data'][0]['title'], 'new title')
+
+
+    def test_bulk_create_recipes(self):
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+        payload = [
+            {'title': 'chapati', 'time_minutes': 40, 'price': '3.00', 'tags': [tag.id]},
+            {'title': 'githeri', 'time_minutes': 90, 'price': '2.50',
+             'tags': [tag.id], 'ingredients': [ingredient.id]},
+            {'title': 'chai', 'time_minutes': 5, 'price': '1.00'},
+        ]
+        
+        response = self.client.post(RECIPES_BULK_URL, payload, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['title'] for r in response.data['data']], ['chapati', 'githeri', 'chai'])
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        githeri = recipes.get(title='githeri')
+        self.assertEqual(list(githeri.tags.all()), [tag])
+        self.assertEqual(list(githeri.ingredients.all()), [ingredient])
+        self.assertEqual(response.data['data'][1]['tags'], [tag.id])
+        
+    def test_bulk_create_recipes_reports_item_errors(self):
+        user2 = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'password123'
+        )
+        other_tag = sample_tag(user=user2)
+        payload = [
+            {'title': 'chapati', 'time_minutes': 40, 'price': '3.00'},
+            {'title': 'githeri', 'time_minutes': 90, 'price': '2.50', 'tags': [other_tag.id]},
+        ]
+        
+        response = self.client.post(RECIPES_BULK_URL, payload, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('tags', response.data[1])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+        
+    def test_bulk_create_requires_list(self):
+        payload = {'title': 'chapati', 'time_minutes': 40, 'price': '3.00'}
+        
+        response = self.client.post(RECIPES_BULK_URL, payload, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+    def test_search_recipes_ranked(self):
+        curry = sample_recipe(user=self.user, title='Chicken curry')
+        sample_recipe(user=self.user, title='Beef stew')
+        best = sample_recipe(user=self.user, title='Curry, curry rice with curry sauce')
+        
+        response = self.client.get(RECIPES_URL, {'q': 'curry'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in response.data['data']], [best.id, curry.id])
+        
+    def test_search_recipes_follows_updates(self):
+        recipe = sample_recipe(user=self.user, title='Ugali')
+        recipe.title = 'Pilau'
+        recipe.save()
+        
+        self.assertEqual(self.client.get(RECIPES_URL, {'q': 'ugali'}).data['data'], [])
+        response = self.client.get(RECIPES_URL, {'q': 'pilau'})
+        self.assertEqual([r['id'] for r in response.data['data']], [recipe.id])
+        
+        recipe.delete()
+        response = self.client.get(RECIPES_URL, {'q': 'pilau'})
+        self.assertEqual(response.data['data'], [])
+        
+    def test_search_recipes_without_terms(self):
+        sample_recipe(user=self.user, title='Mandazi')
+        
+        for text in ('', '!!!'):
+            response = self.client.get(RECIPES_URL, {'q': text})
+            
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['data'], [])
+        
+    def test_search_recipes_paginated(self):
+        recipes = [sample_recipe(user=self.user, title='Mandazi') for _ in range(3)]
+        
+        first = self.client.get(RECIPES_URL, {'q': 'mandazi', 'page_size': 2})
+        second = self.client.get(first.data['next'])
+        
+        ids = [r['id'] for r in first.data['data'] + second.data['data']]
+        self.assertEqual(sorted(ids), sorted(r.id for r in recipes))
+
+        
+    def test_search_recipes_paginated_through_tied_ranks(self):
+        # Non matching recipes too, so the term isn't too common to rank
+        for _ in range(6):
+            sample_recipe(user=self.user, title='Beef stew')
+        best = sample_recipe(user=self.user, title='Mandazi mandazi mandazi')
+        tied = [sample_recipe(user=self.user, title='Mandazi') for _ in range(4)]
+        
+        ids = []
+        response = self.client.get(RECIPES_URL, {'q': 'mandazi', 'page_size': 2})
+        while True:
+            ids += [r['id'] for r in response.data['data']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+            
+        self.assertEqual(ids, [best.id] + sorted((r.id for r in tied), reverse=True))
+        
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual(
+            [r['id'] for r in previous.data['data']],
+            ids[-len(response.data['data']) - 2:-len(response.data['data'])]
+        )
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
 class RecipeImageUploadTests(TestCase):
     
     def setUp(self):
@@ -192,7 +548,20 @@ class RecipeImageUploadTests(TestCase):
         self.recipe = sample_recipe(user=self.user)
         
     def tearDown(self):
-        self.recipe.image.delete()
+        for recipe in Recipe.objects.exclude(image=''):
+            ImageBlob.objects.release(recipe.image.name)
+        
+    def upload_image(self, size=(10, 10), recipe=None):
+        recipe = recipe or self.recipe
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new('RGB', size)
+            img.save(ntf, format='JPEG')
+            ntf.seek(0)
+            return self.client.post(
+                image_upload_url(recipe.id),
+                {'image': ntf},
+                format='multipart'
+            )
         
     def test_upload_image_to_recipe(self):
         url = image_upload_url(self.recipe.id)
@@ -204,7 +573,7 @@ class RecipeImageUploadTests(TestCase):
             
         self.recipe.refresh_from_db()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('image', response.data)
+        self.assertIn('image', response.data['data'])
         self.assertTrue(os.path.exists(self.recipe.image.path))
         
     def test_upload_image_bad_request(self):
@@ -213,6 +582,132 @@ class RecipeImageUploadTests(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         
+    @override_settings(THUMBNAIL_WIDTHS=(160, 320, 640), THUMBNAIL_FORMATS=('WEBP', 'JPEG'))
+    def test_upload_image_generates_variants(self):
+        """ Test resized webp and jpeg copies are stored, never upscaled """
+        response = self.upload_image(size=(400, 300))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        variants = self.recipe.thumbnails
+        self.assertEqual(
+            sorted((variant['width'], variant['format']) for variant in variants),
+            [(160, 'jpg'), (160, 'webp'), (320, 'jpg'), (320, 'webp')]
+        )
+        for variant in variants:
+            with Image.open(self.recipe.image.storage.path(variant['name'])) as img:
+                self.assertEqual(img.width, variant['width'])
+                
+        response = self.client.get(detail_url(self.recipe.id))
+        urls = [variant['url'] for variant in response.data['data']['image_variants']]
+        self.assertEqual(len(urls), 4)
+        self.assertTrue(all(url.startswith('http://testserver/media/') for url in urls))
+        
+    @override_settings(THUMBNAIL_WIDTHS=(160,), THUMBNAIL_FORMATS=('WEBP', 'JPEG'))
+    def test_upload_image_variants_without_webp_encoder(self):
+        """ Test a format Pillow can't write doesn't drop the other variants """
+        with patch.dict(Image.SAVE), self.assertLogs('core.thumbnails', 'ERROR'):
+            Image.SAVE.pop('WEBP', None)
+            response = self.upload_image(size=(400, 300))
+            
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            [(variant['width'], variant['format']) for variant in self.recipe.thumbnails],
+            [(160, 'jpg')]
+        )
+        
+    @override_settings(THUMBNAIL_WORKERS=2)
+    def test_upload_image_returns_before_variants(self):
+        """ Test the variants are rendered in the process pool """
+        with patch('core.thumbnails.get_executor') as get_executor:
+            response = self.upload_image(size=(400, 300))
+            
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['image_variants'], [])
+        submit = get_executor.return_value.submit
+        self.assertEqual(submit.call_args[0][0], thumbnails.render_thumbnails)
+        self.assertTrue(submit.return_value.add_done_callback.called)
+        
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_upload_image_too_large(self):
+        """ Test uploads over the byte limit are refused with a 413 """
+        with tempfile.NamedTemporaryFile(suffix='.png') as ntf:
+            Image.frombytes('RGB', (64, 64), os.urandom(64 * 64 * 3)).save(ntf, format='PNG')
+            ntf.seek(0)
+            response = self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': ntf},
+                format='multipart'
+            )
+            
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=50 * 50)
+    def test_upload_image_too_many_pixels(self):
+        """ Test images announcing too many pixels are refused """
+        response = self.upload_image(size=(100, 100))
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', response.data)
+        
+    def test_upload_image_replaces_variants(self):
+        """ Test uploading a new image drops the variants of the old one """
+        with override_settings(THUMBNAIL_WIDTHS=(160,)):
+            self.upload_image(size=(400, 300))
+        self.recipe.refresh_from_db()
+        old_paths = [
+            self.recipe.image.storage.path(variant['name'])
+            for variant in self.recipe.thumbnails
+        ]
+        old_paths.append(self.recipe.image.path)
+        
+        self.upload_image()
+        
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.thumbnails, [])
+        self.assertEqual(len(old_paths), 3)
+        self.assertFalse(any(os.path.exists(path) for path in old_paths))
+        
+    def test_upload_image_content_addressed(self):
+        """ Test the same file uploaded twice is stored once """
+        other = sample_recipe(user=self.user, title='Other')
+        self.upload_image()
+        self.upload_image(recipe=other)
+        
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        blob = ImageBlob.objects.get()
+        self.assertEqual(self.recipe.image.name, blob.name)
+        self.assertEqual(other.image.name, blob.name)
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(
+            blob.name,
+            f'uploads/recipe/{blob.digest[:2]}/{blob.digest}.jpg'
+        )
+        with open(self.recipe.image.path, 'rb') as f:
+            self.assertEqual(hashlib.sha256(f.read()).hexdigest(), blob.digest)
+        
+    def test_delete_recipe_releases_image(self):
+        """ Test the stored file is deleted with its last recipe """
+        other = sample_recipe(user=self.user, title='Other')
+        self.upload_image()
+        self.upload_image(recipe=other)
+        self.recipe.refresh_from_db()
+        path = self.recipe.image.path
+        
+        self.client.delete(detail_url(other.id))
+        
+        self.assertEqual(ImageBlob.objects.get().refcount, 1)
+        self.assertTrue(os.path.exists(path))
+        
+        self.client.delete(detail_url(self.recipe.id))
+        
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+        
     def test_filter_recipes_by_tags(self):
         recipe1 = sample_recipe(user=self.user, title='Thai vegetable curry')
         recipe2 = sample_recipe(user=self.user, title='Aubergine with tahini')
@@ -230,15 +725,15 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertNotIn(serializer3.data, response.data)
+        self.assertIn(serializer1.data, response.data['data'])
+        self.assertIn(serializer2.data, response.data['data'])
+        self.assertNotIn(serializer3.data, response.data['data'])
         
-    def filter_recipes_by_ingredients(self):
+    def test_filter_recipes_by_ingredients(self):
         recipe1 = sample_recipe(user=self.user, title='Posh beans on toast')
         recipe2 = sample_recipe(user=self.user, title='Chicken cacciatore')
-        ingredient1 = sample_ingredient(user=self.user, title='Feat cheese')
-        ingredient2 = sample_ingredient(user=self.user, title='Chicken')
+        ingredient1 = sample_ingredient(user=self.user, name='Feat cheese')
+        ingredient2 = sample_ingredient(user=self.user, name='Chicken')
         recipe1.ingredients.add(ingredient1)
         recipe2.ingredients.add(ingredient2)
         recipe3 = sample_recipe(user=self.user, title='Steak and mushrooms')
@@ -251,10 +746,26 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, response.data)
-        self.assertIn(serializer2.data, response.data)
-        self.assertNotIn(serializer3.data, response.data)
-
+        self.assertIn(serializer1.data, response.data['data'])
+        self.assertIn(serializer2.data, response.data['data'])
+        self.assertNotIn(serializer3.data, response.data['data'])
         
-    
-      
\ No newline at end of file
+    def test_filter_recipes_matching_all_tags(self):
+        recipe1 = sample_recipe(user=self.user, title='Vegan breakfast')
+        recipe2 = sample_recipe(user=self.user, title='Vegan dinner')
+        tag1 = sample_tag(user=self.user, name='vegan')
+        tag2 = sample_tag(user=self.user, name='breakfast')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+        
+        response = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'tags_match': 'all'}
+        )
+        
+        self.assertEqual([r['id'] for r in response.data['data']], [recipe1.id])
+        
+    def test_filter_recipes_invalid_ids(self):
+        response = self.client.get(RECIPES_URL, {'tags': 'one,two'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsTests(TestCase):
+    """ `?fields=` narrows the rendered fields and the SQL behind them """
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Pilau',
+            time_minutes=45,
+            price=7.50
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+        
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+            
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [query['sql'] for query in queries]
+        
+    def test_recipe_list_fields(self):
+        response, queries = self.get(RECIPES_URL, {'fields': 'title,id'})
+        
+        self.assertEqual(response.data['data'], [
+            {'id': self.recipe.id, 'title': 'Pilau'}
+        ])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('time_minutes', queries[0])
+        self.assertNotIn('price', queries[0])
+        
+    def test_recipe_list_prefetches_requested_relations(self):
+        response, queries = self.get(RECIPES_URL, {'fields': 'id,tags'})
+        
+        self.assertEqual(response.data['data'], [
+            {'id': self.recipe.id, 'tags': [self.tag.id]}
+        ])
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('core_recipe_ingredients', ' '.join(queries))
+        
+    def test_recipe_detail_fields(self):
+        response, queries = self.get(detail_url(self.recipe.id), {
+            'fields': 'title,ingredients,image_variants'
+        })
+        
+        self.assertEqual(response.data['data'], {
+            'title': 'Pilau',
+            'ingredients': [
+                {'id': self.ingredient.id, 'name': 'Rice', 'user': self.user.id}
+            ],
+            'image_variants': [],
+        })
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('core_recipe_tags', ' '.join(queries))
+        self.assertNotIn('"core_recipe"."price"', queries[0])
+        
+    def test_tag_list_fields_keep_cursor(self):
+        Tag.objects.create(user=self.user, name='Breakfast')
+        
+        response, queries = self.get(TAGS_URL, {'fields': 'name', 'page_size': 1})
+        next_response, _queries = self.get(response.data['next'], {})
+        
+        self.assertEqual(response.data['data'], [{'name': 'Dinner'}])
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(next_response.data['data'], [{'name': 'Breakfast'}])
+        
+    def test_unknown_field_rejected(self):
+        response = self.client.get(RECIPES_URL, {'fields': 'title,secret'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', str(response.data['fields'][0]))
+        
+    def test_writes_return_every_field(self):
+        url = f'{RECIPES_URL}?fields=id'
+        response = self.client.post(url, {
+            'title': 'Chapati',
+            'time_minutes': 30,
+            'price': '2.00',
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['title'], 'Chapati')
+        self.assertEqual(response.data['data']['tags'], [self.tag.id])
@@ -1,3 +1,6 @@
+import base64
+import json
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -42,7 +45,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = serializers.TagSerializer(tags, many=True)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['data'], serializer.data)
         
     def test_tags_limited_to_user(self):
         user2 = get_user_model().objects.create_user(
@@ -55,8 +58,8 @@ class PrivateTagsApiTests(TestCase):
         response = self.client.get(TAGS_URL)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], tag.name)
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertEqual(response.data['data'][0]['name'], tag.name)
         
     def test_create_tag_successful(self):
         payload = {'name': "Test"}
@@ -89,8 +92,8 @@ class PrivateTagsApiTests(TestCase):
         
         serializer1 = serializers.TagSerializer(tag1)
         serializer2 = serializers.TagSerializer(tag2)
-        self.assertIn(serializer1.data, response.data)
-        self.assertNotIn(serializer2.data, response.data)
+        self.assertIn(serializer1.data, response.data['data'])
+        self.assertNotIn(serializer2.data, response.data['data'])
         
     def test_retrieve_tags_assigned_unique(self):
         tag = Tag.objects.create(user=self.user, name='Breakfast')
@@ -112,6 +115,72 @@ class PrivateTagsApiTests(TestCase):
         
         response = self.client.get(TAGS_URL, {'assigned_only': 1})
         
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['data']), 1)
+        
+    def test_retrieve_tags_assigned_only_invalid(self):
+        response = self.client.get(TAGS_URL, {'assigned_only': 'abc'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('assigned_only', response.data)
+        
+    def test_retrieve_tags_queries_run_once(self):
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Desert')
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(TAGS_URL)
+            
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 2)
+        
+    def test_partial_update_tag_queries_run_once(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        
+        # one query to fetch the tag and one to save it
+        with self.assertNumQueries(2):
+            response = self.client.patch(url, {'name': 'Vegetarian'})
+            
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['name'], 'Vegetarian')
+        
+    def test_delete_other_users_tag_not_found(self):
+        user2 = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'other123'
+        )
+        tag = Tag.objects.create(user=user2, name='other')
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        
+        response = self.client.delete(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(Tag.objects.filter(id=tag.id).exists())
+        
+    def test_bulk_create_tags(self):
+        url = reverse('recipe:tag-bulk')
+        payload = [{'name': 'Vegan'}, {'name': 'Breakfast'}]
         
+        response = self.client.post(url, payload, format='json')
         
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertTrue(all(tag['id'] for tag in response.data['data']))
+        
+    def test_bulk_create_tags_invalid_item(self):
+        url = reverse('recipe:tag-bulk')
+        payload = [{'name': 'Vegan'}, {'name': ''}]
+        
+        response = self.client.post(url, payload, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', response.data[1])
+        self.assertFalse(Tag.objects.exists())
+        
+    def test_retrieve_tags_hand_edited_cursor(self):
+        Tag.objects.create(user=self.user, name='Vegan')
+        for values in ([None, 1], ['Vegan', 'abc'], ['Vegan', [1]]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'v': values}).encode('utf-8'))
+            response = self.client.get(TAGS_URL, {'cursor': cursor.decode('ascii')})
+            
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
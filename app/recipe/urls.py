@@ -13,11 +13,16 @@ app_name = 'recipe'
 
 urlpatterns = [
     
-    path('tags/', views.TagListCreateAPIView.as_view()),
-    path('tags/<int:pk>/', views.TagRetrieveUpdateDestroyAPIView.as_view()),
-    path('ingredients/', views.IngredientListCreateAPIView.as_view()),
-    path('ingredients/<int:pk>/', views.IngredientRetrieveUpdateDestroyAPIView.as_view()),
-    path('recipes/', views.RecipeListCreateAPIView.as_view()),
-    path('recipes/<int:pk>/', views.RecipeRetrieveUpdateDestroyAPIView.as_view()),
+    path('tags/', views.TagListCreateAPIView.as_view(), name='tag-list'),
+    path('tags/bulk/', views.TagBulkCreateAPIView.as_view(), name='tag-bulk'),
+    path('tags/<int:pk>/', views.TagRetrieveUpdateDestroyAPIView.as_view(), name='tag-detail'),
+    path('ingredients/', views.IngredientListCreateAPIView.as_view(), name='ingredient-list'),
+    path('ingredients/bulk/', views.IngredientBulkCreateAPIView.as_view(), name='ingredient-bulk'),
+    path('ingredients/<int:pk>/', views.IngredientRetrieveUpdateDestroyAPIView.as_view(), name='ingredient-detail'),
+    path('recipes/', views.RecipeListCreateAPIView.as_view(), name='recipe-list'),
+    path('recipes/bulk/', views.RecipeBulkCreateAPIView.as_view(), name='recipe-bulk'),
+    path('recipes/<int:pk>/', views.RecipeRetrieveUpdateDestroyAPIView.as_view(), name='recipe-detail'),
+    path('recipes/<int:pk>/upload-image/', views.RecipeUploadImageAPIView.as_view(), name='recipe-upload-image'),
+    path('autocomplete/', views.AutocompleteAPIView.as_view(), name='autocomplete'),
 
 ]
@@ -1,270 +1,247 @@
-from rest_framework.decorators import action
-from rest_framework.response import Response
-from rest_framework import viewsets, mixins, status, generics
-from rest_framework.authentication import TokenAuthentication
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.exceptions import ValidationError
+from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe, User
-from .serializers import TagSerializer, IngredientSerializer, RecipeSerializer
+from core.mixins import (
+    BulkCreateMixin, CachedResponseMixin, EnvelopeResponseMixin, SparseFieldsMixin,
+    StreamingListMixin, UserScopedMixin
+)
+from core.pagination import KeysetPagination
+from core.search import autocomplete
+from core.thumbnails import schedule_thumbnails
+from core.uploads import LimitedTemporaryFileUploadHandler
+from core.models import Tag, Ingredient, Recipe
+from user.authentication import SignedTokenAuthentication
+from .filters import RecipeRelationFilter, RecipeSearchFilter
+from .serializers import (
+    TagSerializer, IngredientSerializer, RecipeSerializer, RecipeDetailSerializer,
+    TagBulkSerializer, IngredientBulkSerializer, RecipeBulkSerializer, RecipeImageSerializer
+)
 
 # Create your views here.
 
-class TagListCreateAPIView(generics.ListCreateAPIView):
+class AssignedOnlyMixin(object):
+    """ Support `?assigned_only=1` to list only attributes used by a recipe """
+    
+    def get_queryset(self):
+        queryset = super(AssignedOnlyMixin, self).get_queryset()
+        value = self.request.query_params.get('assigned_only', '').lower()
+        if value not in ('', '0', '1', 'false', 'true'):
+            raise ValidationError({'assigned_only': [_('Expected 0 or 1.')]})
+            
+        if value in ('1', 'true'):
+            queryset = queryset.filter(recipe__isnull=False).distinct()
+            
+        return queryset
+    
+
+class TagListCreateAPIView(AssignedOnlyMixin, SparseFieldsMixin, UserScopedMixin, StreamingListMixin, CachedResponseMixin, EnvelopeResponseMixin, generics.ListCreateAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
-    
-    def list(self, request, *args, **kwargs):
-        super(TagListCreateAPIView, self).list(request, *args, **kwargs)
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'All tags retrieved successfully',
-            'data': data
-        }
-        
-        return Response(response)
+    authentication_classes = (SignedTokenAuthentication,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-name', '-id')
     
-    def create(self, request, *args, **kwargs):
-        user = request.user
-        
-        request.data._mutable = True
-        request.data.update({
-            'user': user.id
-        })
-        request.data._mutable = False
-        
-        super(TagListCreateAPIView, self).create(request, *args, **kwargs)
+    list_message = 'All tags retrieved successfully'
+    create_message = 'Tag created successfully'
         
-        response = {
-            'status': status.HTTP_201_CREATED,
-            'message': 'Tag created successfully',
-            'data': request.data
-        }
-        
-        return Response(response)
     
+class TagBulkCreateAPIView(UserScopedMixin, BulkCreateMixin, EnvelopeResponseMixin, generics.CreateAPIView):
+    queryset = Tag.objects.all()
+    serializer_class = TagBulkSerializer
+    
+    permission_classes = (IsAuthenticated,)
+    authentication_classes = (SignedTokenAuthentication,)
     
-class TagRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+    create_message = 'Tags created successfully'
+    
+    
+class TagRetrieveUpdateDestroyAPIView(SparseFieldsMixin, UserScopedMixin, CachedResponseMixin, EnvelopeResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
-    
-    def retrieve(self, request, *args, **kwargs):
-        super(TagRetrieveUpdateDestroyAPIView, self).retrieve(request, *args, **kwargs)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Tag detail retrieved successfully',
-            'data': data
-        }
-        
-        return Response(response)
-    
-    def patch(self, request, *args, **kwargs):
-        super(TagRetrieveUpdateDestroyAPIView, self).patch(request, *args, **kwargs)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Tag details upated successfully',
-            'data': data
-        }
-        
-        return Response(response)
-    
-    def delete(self, request, *args, **kwargs):
-        super(TagRetrieveUpdateDestroyAPIView, self).delete(request, *args, **kwargs)
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Tag deleted suucessfully'
-        }
-        
-        return Response(response)
+    authentication_classes = (SignedTokenAuthentication,)
+    
+    retrieve_message = 'Tag detail retrieved successfully'
+    update_message = 'Tag details upated successfully'
+    destroy_message = 'Tag deleted suucessfully'
  
     
-class IngredientListCreateAPIView(generics.ListCreateAPIView):
+class IngredientListCreateAPIView(AssignedOnlyMixin, SparseFieldsMixin, UserScopedMixin, StreamingListMixin, CachedResponseMixin, EnvelopeResponseMixin, generics.ListCreateAPIView):
     
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     
     permission_classes = (IsAuthenticated,)
-    authentication_classes = (TokenAuthentication,)
-    
-    def list(self, request, *args, **kwargs):
-        super(IngredientListCreateAPIView, self).list(request, *args, **kwargs)
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'All Ingredients retrieved successfully',
-            'data': data
-        }
-        
-        return Response(response)
+    authentication_classes = (SignedTokenAuthentication,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-name', '-id')
     
-    def create(self, request, *args, **kwargs):
-        user = request.user
-        
-        request.data._mutable = True
-        request.data.update({
-            'user': user.id
-        })
-        request.data._mutable = False
-        
-        super(IngredientListCreateAPIView, self).create(request, *args, **kwargs)
-        
-        response = {
-            'status': status.HTTP_201_CREATED,
-            'message': 'Ingredient created successfully',
-            'data': request.data
-        }
-        
-        return Response(response)
-   
+    list_message = 'All Ingredients retrieved successfully'
+    create_message = 'Ingredient created successfully'
+       
     
-class IngredientRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class IngredientBulkCreateAPIView(UserScopedMixin, BulkCreateMixin, EnvelopeResponseMixin, generics.CreateAPIView):
     queryset = Ingredient.objects.all()
-    serializer_class = IngredientSerializer
+    serializer_class = IngredientBulkSerializer
     
-    authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    authentication_classes = (SignedTokenAuthentication,)
     
-    def retrieve(self, request, *args, **kwargs):
-        super(IngredientRetrieveUpdateDestroyAPIView, self).retrieve(request, *args, **kwargs)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Ingredient retrieved successfully',
-            'data': data
-        }
-        
-        return Response(response)
+    create_message = 'Ingredients created successfully'
     
-    def patch(self, request, *args, **kwargs):
-        super(IngredientRetrieveUpdateDestroyAPIView, self).patch(request, *args, **kwargs)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Ingredient updated successfully',
-            'data': data
-        }
-        
-        return Response(response)
     
-    def delete(self, request, *args, **kwargs):
-        super(IngredientRetrieveUpdateDestroyAPIView, self).delete(request, *args, **kwargs)
-        
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Ingredient deleted successfully',
-        }
-        
-        return Response(response)
+class IngredientRetrieveUpdateDestroyAPIView(SparseFieldsMixin, UserScopedMixin, CachedResponseMixin, EnvelopeResponseMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Ingredient.objects.all()
+    serializer_class = IngredientSerializer
+    
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    
+    retrieve_message = 'Ingredient retrieved successfully'
+    update_message = 'Ingredient updated successfully'
+    destroy_message = 'Ingredient deleted successfully'
   
 
-class RecipeListCreateAPIView(generics.ListCreateAPIView):
+class RecipeQuerysetMixin(object):
+    """
+    Prefetch the recipe relations the way the view's serializer renders
+    them, so a page of N recipes costs a constant number of queries.
+    Relations left out of a `?fields=` selection are not fetched at all.
+    """
+    
+    def get_queryset(self):
+        queryset = super(RecipeQuerysetMixin, self).get_queryset()
+        return self.get_serializer_class().setup_eager_loading(
+            queryset, self.get_sparse_fields()
+        )
+    
+
+class RecipeListCreateAPIView(RecipeQuerysetMixin, SparseFieldsMixin, UserScopedMixin, StreamingListMixin, CachedResponseMixin, EnvelopeResponseMixin, generics.ListCreateAPIView):
     
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    filter_backends = (RecipeRelationFilter, RecipeSearchFilter)
     
-    def list(self, request, *args, **kwargs):
-        super(RecipeListCreateAPIView, self).list(request, *args, **kwargs)
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'All recipes retrieved suuccessfully',
-            'data': data
-        }
-        
-        return Response(response)
+    list_message = 'All recipes retrieved suuccessfully'
+    create_message = 'Recipe create succesfully'
     
-    def create(self, request, *args, **kwargs):
-        user = self.request.user
+    @property
+    def keyset_ordering(self):
+        if RecipeSearchFilter.search_param in self.request.query_params:
+            return ('-rank', '-id')
         
-        request.data._mutable = True
+        return ('-id',)
         
-        request.data.update({
-            'user': user.id
-        })  
-        request.data._mutable = False
-              
-        super(RecipeListCreateAPIView, self).create(request, *args, **kwargs)
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Recipe create succesfully',
-            'data': request.data
-        }
-        
-        return Response(response)
     
+class RecipeBulkCreateAPIView(UserScopedMixin, BulkCreateMixin, EnvelopeResponseMixin, generics.CreateAPIView):
+    queryset = Recipe.objects.all()
+    serializer_class = RecipeBulkSerializer
+    
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    
+    create_message = 'Recipes created successfully'
     
-class RecipeRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+    
+class RecipeRetrieveUpdateDestroyAPIView(RecipeQuerysetMixin, SparseFieldsMixin, UserScopedMixin, CachedResponseMixin, EnvelopeResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     
-    def retrieve(self, request, *args, **kwargs):
-        super(RecipeRetrieveUpdateDestroyAPIView, self).retrieve(request, *args, **kwargs)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Recipe retrieved successfully',
-            'data': data
-        }
-        
-        return Response(response)
-        
-    def patch(self, request, *args, **kwargs):
-        super(RecipeRetrieveUpdateDestroyAPIView, self).patch(request, *args, **kwargs)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Recipe updated successfully',
-            'data': data
-        }
+    retrieve_message = 'Recipe retrieved successfully'
+    update_message = 'Recipe updated successfully'
+    destroy_message = 'Recipe deleted successfully'
+    
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return RecipeDetailSerializer
         
-        return Response(response)
+        return self.serializer_class
+    
     
-    def delete(self, request, *args, **kwargs):
-        super(RecipeRetrieveUpdateDestroyAPIView, self).delete(request, *args, **kwargs)
+class RecipeUploadImageAPIView(UserScopedMixin, EnvelopeResponseMixin, generics.GenericAPIView):
+    """
+    Store an uploaded recipe image and answer straight away; the resized
+    variants are rendered in the background and show up in
+    `image_variants` once they are ready.
+    """
+    queryset = Recipe.objects.all()
+    serializer_class = RecipeImageSerializer
+    
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    
+    def initialize_request(self, request, *args, **kwargs):
+        # Before DRF wraps the request, so the body is never parsed with
+        # the default, memory buffering, upload handlers
+        request.upload_handlers = [LimitedTemporaryFileUploadHandler(request)]
+        return super(RecipeUploadImageAPIView, self).initialize_request(request, *args, **kwargs)
+    
+    def post(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        serializer = self.get_serializer(recipe, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        schedule_thumbnails(serializer.instance)
+        
+        return self.envelope('Recipe image uploaded successfully', self.serialize(serializer))
+    
+    
+class AutocompleteAPIView(EnvelopeResponseMixin, generics.GenericAPIView):
+    """
+    Suggest the user's tag or ingredient names while they type, e.g.
+    `?type=ingredients&q=avoc&limit=10`. Responses may be cached privately
+    for a few seconds since keystrokes repeat the same prefixes.
+    """
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    
+    sources = {
+        'tags': Tag,
+        'ingredients': Ingredient,
+    }
+    default_limit = 10
+    max_limit = 50
+    cache_max_age = 30
+    
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': [_('A valid integer is required.')]})
+        
+        return max(1, min(limit, self.max_limit))
+    
+    def get(self, request, *args, **kwargs):
+        source = request.query_params.get('type', 'ingredients')
+        if source not in self.sources:
+            raise ValidationError({
+                'type': [_('Expected one of: {choices}.').format(choices=', '.join(self.sources))]
+            })
+            
+        queryset = self.sources[source].objects.filter(user=request.user).only('id', 'name')
+        matches = autocomplete(queryset, request.query_params.get('q'), self.get_limit())
+        data = [{'id': match.id, 'name': match.name} for match in matches]
         
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'Recipe deleted successfully'
-        }
+        response = self.envelope('Suggestions retrieved successfully', data)
+        patch_cache_control(response, private=True, max_age=self.cache_max_age)
+        patch_vary_headers(response, ('Authorization',))
         
-        return Response(response)
+        return response
     
 # class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
     
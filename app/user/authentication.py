@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from . import tokens
+
+
+AUTH_CACHE_ALIAS = getattr(settings, 'AUTH_CACHE_ALIAS', 'auth')
+
+
+def token_cache_key(key):
+    return f'auth:token:{key}'
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_token(key):
+    caches[AUTH_CACHE_ALIAS].delete(token_cache_key(key))
+
+
+def invalidate_user(user_id):
+    caches[AUTH_CACHE_ALIAS].delete(user_cache_key(user_id))
+
+
+def get_cached_user(user_id):
+    cache = caches[AUTH_CACHE_ALIAS]
+
+    user = cache.get(user_cache_key(user_id))
+    if user is None:
+        try:
+            user = get_user_model().objects.get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        cache.set(user_cache_key(user_id), user)
+
+    return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for DRF's TokenAuthentication that remembers
+    token -> user lookups in the `auth` cache instead of joining Token and
+    User on every request.
+
+    The token and the user are cached under separate keys, so deleting a
+    token or saving a user only has to drop one entry. The bound and TTL
+    come from the cache configuration. The alias must be shared by every
+    process serving the api (memcached in docker-compose): a per-process
+    LocMemCache only forgets a deleted token or deactivated user in the
+    process that made the change.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = caches[AUTH_CACHE_ALIAS]
+
+        token = cache.get(token_cache_key(key))
+        if token is not None:
+            user = cache.get(user_cache_key(token.user_id))
+            if user is not None:
+                # The user entry may have been reloaded on its own since
+                # the token was cached, so check it like DRF does
+                if not user.is_active:
+                    raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+                token.user = user
+                return (user, token)
+
+        user, token = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+        cache.set_many({
+            token_cache_key(key): Token(
+                key=token.key,
+                user_id=token.user_id,
+                created=token.created
+            ),
+            user_cache_key(user.pk): user,
+        })
+
+        return (user, token)
+
+
+class SignedTokenAuthentication(CachedTokenAuthentication):
+    """
+    Authenticate the signed, expiring access tokens issued by
+    `user/token/`. The HMAC and the expiry are checked in CPU and the
+    user comes from the `auth` cache, so a warm request needs no query.
+    A token is only accepted while its generation matches the user's
+    `token_generation`, which `User.revoke_tokens()` bumps.
+
+    Keys without a signature are legacy authtoken rows and fall back to
+    the cached database lookup.
+    """
+
+    def authenticate_credentials(self, key):
+        if not tokens.is_signed_token(key):
+            return super(SignedTokenAuthentication, self).authenticate_credentials(key)
+
+        try:
+            user_id, generation = tokens.verify_access_token(key)
+        except tokens.InvalidToken:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user = get_cached_user(user_id)
+        if user is None or user.token_generation != generation:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (user, key)
@@ -3,6 +3,8 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from . import tokens
+
 
 class UserSerializer(serializers.ModelSerializer):
     
@@ -48,4 +50,22 @@ class AuthTokenSerializer(serializers.Serializer):
             raise serializers.ValidationError(message, code='authenticate')
         
         attrs['user'] = user
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField(trim_whitespace=False)
+    
+    def validate(self, attrs):
+        message = _('Invalid or expired refresh token')
+        try:
+            user_id, generation = tokens.verify_refresh_token(attrs.get('refresh'))
+        except tokens.InvalidToken:
+            raise serializers.ValidationError(message, code='authenticate')
+        
+        user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+        if not user or user.token_generation != generation:
+            raise serializers.ValidationError(message, code='authenticate')
+        
+        attrs['user'] = user
+        return attrs
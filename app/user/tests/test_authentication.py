@@ -0,0 +1,155 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import user_cache_key
+
+
+ME_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    
+    def setUp(self):
+        caches['auth'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='josekangethe2@gmail.com',
+            password='test@123',
+            name='name'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        
+    def test_token_lookup_cached(self):
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+            
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_URL)
+            
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['email'], self.user.email)
+        
+    def test_deleted_token_rejected(self):
+        self.client.get(ME_URL)
+        self.token.delete()
+        
+        response = self.client.get(ME_URL)
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_deactivated_user_rejected(self):
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+        
+        response = self.client.get(ME_URL)
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_user_deactivated_by_queryset_update_rejected(self):
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        
+        response = self.client.get(ME_URL)
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_user_reloaded_inactive_rejected(self):
+        self.client.get(ME_URL)
+        # The user entry reloaded on its own since the token was cached
+        caches['auth'].set(
+            user_cache_key(self.user.pk),
+            get_user_model()(pk=self.user.pk, email=self.user.email, is_active=False)
+        )
+        
+        response = self.client.get(ME_URL)
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_changed_user_reloaded(self):
+        self.client.get(ME_URL)
+        self.user.name = 'new name'
+        self.user.save()
+        
+        response = self.client.get(ME_URL)
+        
+        self.assertEqual(response.data['data']['name'], 'new name')
+        
+        
+class SignedTokenAuthenticationTests(TestCase):
+    
+    def setUp(self):
+        caches['auth'].clear()
+        self.payload = {'email': 'josekangethe2@gmail.com', 'password': 'test@123'}
+        self.user = get_user_model().objects.create_user(**self.payload)
+        self.client = APIClient()
+        response = self.client.post(TOKEN_URL, self.payload)
+        self.tokens = response.data
+        
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        
+    def test_signed_token_needs_no_queries_when_warm(self):
+        self.authenticate(self.tokens['token'])
+        self.client.get(ME_URL)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_URL)
+            
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+    def test_tampered_token_rejected(self):
+        self.authenticate(self.tokens['token'][:-1] + 'x')
+        
+        response = self.client.get(ME_URL)
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_expired_token_rejected(self):
+        self.authenticate(self.tokens['token'])
+        
+        with patch('time.time', return_value=10 ** 10):
+            response = self.client.get(ME_URL)
+            
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_refresh_token_not_accepted_as_access_token(self):
+        self.authenticate(self.tokens['refresh'])
+        
+        response = self.client.get(ME_URL)
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_refresh_issues_new_access_token(self):
+        response = self.client.post(REFRESH_URL, {'refresh': self.tokens['refresh']})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.authenticate(response.data['token'])
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+        
+    def test_revoke_invalidates_all_tokens(self):
+        legacy = Token.objects.create(user=self.user)
+        self.authenticate(self.tokens['token'])
+        self.client.get(ME_URL)
+        
+        response = self.client.post(REVOKE_URL)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.authenticate(legacy.key)
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        refresh = self.client.post(REFRESH_URL, {'refresh': self.tokens['refresh']})
+        self.assertEqual(refresh.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,62 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import seed
+from core.tests.utils import QueryScalingMixin
+from user import tokens, views
+
+
+class UserQueryScalingTests(QueryScalingMixin, TestCase):
+    """ Every user endpoint with 1, 10 and 100 users, each owning recipes """
+    
+    def setUp(self):
+        self.client = APIClient()
+        
+    def seeded_user(self, n):
+        users = seed.seed(n, 3, 3, 3)
+        self.client.force_authenticate(users[0])
+        
+        return users[0]
+    
+    def test_user_list_and_create(self):
+        url = reverse('user:create')
+        
+        self.assertConstantQueries(views.UserListCreateView, lambda n: (
+            'GET', url, self.seeded_user(n) and None
+        ))
+        self.assertConstantQueries(views.UserListCreateView, lambda n: (
+            'POST', url, self.seeded_user(n) and {
+                'email': f'new{n}@example.com', 'password': 'testpass', 'name': 'New',
+            }
+        ))
+        
+    def test_tokens(self):
+        def token(n):
+            user = self.seeded_user(n)
+            return 'POST', reverse('user:token'), {
+                'email': user.email, 'password': seed.SEED_PASSWORD,
+            }
+        
+        def refresh(n):
+            user = self.seeded_user(n)
+            return 'POST', reverse('user:token-refresh'), {
+                'refresh': tokens.issue_refresh_token(user),
+            }
+        
+        self.assertConstantQueries(views.CreateTokenView, token)
+        self.assertConstantQueries(views.RefreshTokenView, refresh)
+        self.assertConstantQueries(views.RevokeTokensView, lambda n: (
+            'POST', reverse('user:token-revoke'), self.seeded_user(n) and None
+        ))
+        
+    def test_me(self):
+        url = reverse('user:me')
+        
+        self.assertConstantQueries(views.ManageUserRetrieveUpdateView, lambda n: (
+            'GET', url, self.seeded_user(n) and None
+        ))
+        self.assertConstantQueries(views.ManageUserRetrieveUpdateView, lambda n: (
+            'PATCH', url, self.seeded_user(n) and {'name': 'Renamed'}
+        ))
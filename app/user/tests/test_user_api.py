@@ -29,9 +29,9 @@ class PublicUserApiTests(TestCase):
         response = self.client.post(CREATE_USER_URL, payload)
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        user = get_user_model().objects.get(**response.data)
+        user = get_user_model().objects.get(**response.data['data'])
         self.assertTrue(user.check_password(payload['password']))
-        self.assertNotIn('password', response.data)
+        self.assertNotIn('password', response.data['data'])
         
     def test_user_exists(self):
         payload = {'email': 'josekangethe2@gmail.com', 'password': 'testpass'}
@@ -102,7 +102,7 @@ class PrivateUserApiTests(TestCase):
         response = self.client.get(ME_URL)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, {
+        self.assertEqual(response.data['data'], {
             'name': self.user.name,
             'email': self.user.email
             
@@ -122,4 +122,9 @@ class PrivateUserApiTests(TestCase):
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
-        
\ No newline at end of file
+    def test_retrieve_profile_queries_run_once(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_URL)
+            
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['message'], 'User account retrieved successfully')
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core import signing
+
+
+ACCESS_TOKEN_SALT = 'user.tokens.access'
+REFRESH_TOKEN_SALT = 'user.tokens.refresh'
+TOKEN_SEP = ':'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _sign(user, salt):
+    signer = signing.TimestampSigner(sep=TOKEN_SEP, salt=salt)
+    return signer.sign(f'{user.pk}{TOKEN_SEP}{user.token_generation}')
+
+
+def _unsign(token, salt, max_age):
+    """
+    Check the HMAC and the age of a signed token and return the
+    (user id, token generation) it was issued for. Pure CPU, no queries.
+    """
+    signer = signing.TimestampSigner(sep=TOKEN_SEP, salt=salt)
+    try:
+        value = signer.unsign(token, max_age=max_age)
+        user_id, generation = value.split(TOKEN_SEP)
+        return int(user_id), int(generation)
+    except (signing.BadSignature, ValueError):
+        raise InvalidToken()
+
+
+def is_signed_token(token):
+    return TOKEN_SEP in token
+
+
+def issue_access_token(user):
+    return _sign(user, ACCESS_TOKEN_SALT)
+
+
+def issue_refresh_token(user):
+    return _sign(user, REFRESH_TOKEN_SALT)
+
+
+def issue_token_pair(user):
+    return {
+        'token': issue_access_token(user),
+        'refresh': issue_refresh_token(user),
+        'expires_in': settings.ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def verify_access_token(token):
+    return _unsign(token, ACCESS_TOKEN_SALT, settings.ACCESS_TOKEN_LIFETIME)
+
+
+def verify_refresh_token(token):
+    return _unsign(token, REFRESH_TOKEN_SALT, settings.REFRESH_TOKEN_LIFETIME)
@@ -7,5 +7,7 @@ app_name = 'user'
 urlpatterns = [
     path('create/', views.UserListCreateView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token' ),
+    path('token/refresh/', views.RefreshTokenView.as_view(), name='token-refresh'),
+    path('token/revoke/', views.RevokeTokensView.as_view(), name='token-revoke'),
     path('me/', views.ManageUserRetrieveUpdateView.as_view(), name='me'),
 ]
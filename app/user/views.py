@@ -1,78 +1,65 @@
-from rest_framework import generics, authentication, permissions, status
-from rest_framework.response import Response
+from rest_framework import generics, permissions
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.mixins import EnvelopeResponseMixin
 from core.models import User
-from .serializers import UserSerializer, AuthTokenSerializer
+from . import tokens
+from .authentication import SignedTokenAuthentication
+from .serializers import UserSerializer, AuthTokenSerializer, RefreshTokenSerializer
 
 # Create your views here.
 
 
-class UserListCreateView(generics.ListCreateAPIView):
+class UserListCreateView(EnvelopeResponseMixin, generics.ListCreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     
-    def list(self, request, *args, **kwargs):
-        super(UserListCreateView, self).list(request, *args, **kwargs)
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'All user details rettieved successfully',
-            'data': data
-        }
-        
-        return Response(response)
-    
-    def create(self, request, *args, **kwargs):
-        super(UserListCreateView, self).create(request, *args, **kwargs)
-        response = {
-            'status': status.HTTP_201_CREATED,
-            'message': 'User created successfully',
-            'data': request.data
-        }
-        
-        return Response(response)
+    list_message = 'All user details rettieved successfully'
+    create_message = 'User created successfully'
         
 
 class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        
+        return Response(tokens.issue_token_pair(user))
+    
+
+class RefreshTokenView(CreateTokenView):
+    serializer_class = RefreshTokenSerializer
+    
+
+class RevokeTokensView(EnvelopeResponseMixin, generics.GenericAPIView):
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+    
+    def post(self, request, *args, **kwargs):
+        request.user.revoke_tokens()
+        Token.objects.filter(user=request.user).delete()
+        
+        return self.envelope('All tokens revoked successfully')
     
 
-class ManageUserRetrieveUpdateView(generics.RetrieveUpdateAPIView):
+class ManageUserRetrieveUpdateView(EnvelopeResponseMixin, generics.RetrieveUpdateAPIView):
     # queryset = User.objects.all()
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (SignedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
     
+    retrieve_message = 'User account retrieved successfully'
+    update_message = 'User account updated successfully'
+    
     def get_object(self):
         return self.request.user
-    
-    def get(self, request, *args, **kwargs):
-        instance = self.request.user
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'User account retrieved successfully',
-            'data': data
-        }
-        
-        return Response(response)
-    
-    def patch(self, request, *args, **kwargs):
-        super(ManageUserRetrieveUpdateView, self).patch(request, *args, **kwargs)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        data = serializer.data
-        
-        response = {
-            'status': status.HTTP_200_OK,
-            'message': 'User account updated successfully',
-            'data': data
-        }
-        return Response(response)
\ No newline at end of file